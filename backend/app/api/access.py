@@ -7,7 +7,7 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.auth import get_current_user, require_memorial_access
+from app.auth import ensure_memorial_exists, get_current_user, require_memorial_access
 from app.db import get_db
 from app.i18n import get_lang, tr
 from app.models import AccessRequest, AccessRequestStatus, MemorialAccess, User, UserRole
@@ -231,11 +231,8 @@ async def request_access(
     lang: str = Depends(get_lang),
 ):
     """Запросить доступ к мемориалу. Только для зарегистрированных пользователей без доступа."""
-    # Проверяем что мемориал существует (404 если нет)
-    from app.models import Memorial
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
-    if not memorial:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=tr(lang, "memorial_not_found"))
+    # Проверяем что мемориал существует (404 если нет) — EXISTS, без загрузки строки
+    ensure_memorial_exists(db, memorial_id, detail=tr(lang, "memorial_not_found"))
 
     # Проверяем что у пользователя ещё нет доступа
     existing_access = (
@@ -8,10 +8,11 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from pathlib import Path
 
+import aiofiles
 import httpx
 
 from app.db import get_db
-from app.auth import get_current_user, get_optional_user
+from app.auth import ensure_memorial_exists, get_current_user, get_optional_user
 from app.models import Memorial, Media, Memory, MediaType, FamilyRelationship, User, UserRole
 from app.services.billing import (
     check_chat_quota,
@@ -39,6 +40,7 @@ from app.schemas import (
 from app.services.ai_tasks import (
     get_embedding,
     generate_rag_response,
+    generate_rag_response_stream,
     search_similar_memories,
     generate_speech_elevenlabs,
     create_custom_voice_elevenlabs,
@@ -47,15 +49,54 @@ from app.services.ai_tasks import (
     build_avatar_persona,
     sync_family_memories,
 )
-from app.workers.worker import animate_photo_task, create_memory_embedding_task
+from app.workers.worker import animate_photo_task, create_memory_embedding_task, generate_tts_task
 from app.services.s3_service import upload_file_to_s3, get_public_url
+from app.services.semantic_cache import chat_answer_cache
 from app.config import settings
+import asyncio
+import hashlib
 import os
 import uuid
 import tempfile
 
+from app.ttl_cache import TTLCache
+
 router = APIRouter(prefix="/ai", tags=["ai"])
 
+logger = logging.getLogger(__name__)
+
+# Расширения изображений, которые принимает D-ID (URL должен на них заканчиваться)
+_VALID_IMAGE_EXT = frozenset({".jpg", ".jpeg", ".png"})
+
+# Короткий TTL-кэш Memorial/Media по id: чат и поллинг статуса анимации бьют
+# в одни и те же строки десятками запросов подряд. TTL у Media короче, потому
+# что worker обновляет animation_task_id из другого процесса.
+_memorial_cache = TTLCache(maxsize=1024, ttl=10.0)
+_media_cache = TTLCache(maxsize=1024, ttl=5.0)
+
+
+def get_memorial_cached(db: Session, memorial_id: int) -> Optional[Memorial]:
+    """Memorial по id через TTL-кэш; при попадании объект привязывается
+    к текущей сессии через merge(load=False) без SQL."""
+    cached = _memorial_cache.get(memorial_id)
+    if cached is not None:
+        return db.merge(cached, load=False)
+    memorial = db.get(Memorial, memorial_id)
+    if memorial is not None:
+        _memorial_cache.set(memorial_id, memorial)
+    return memorial
+
+
+def get_media_cached(db: Session, media_id: int) -> Optional[Media]:
+    """Media по id через TTL-кэш (см. get_memorial_cached)."""
+    cached = _media_cache.get(media_id)
+    if cached is not None:
+        return db.merge(cached, load=False)
+    media = db.get(Media, media_id)
+    if media is not None:
+        _media_cache.set(media_id, media)
+    return media
+
 
 @router.post("/photo/animate", response_model=PhotoAnimateResponse)
 async def animate_photo(
@@ -71,7 +112,7 @@ async def animate_photo(
     check_animation_quota(current_user, db)
 
     # Проверка существования медиа
-    media = db.query(Media).filter(Media.id == request.media_id).first()
+    media = get_media_cached(db, request.media_id)
     if not media:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -100,20 +141,11 @@ async def animate_photo(
         # Поэтому добавляем расширение файла к URL
         public_api_url = getattr(settings, 'PUBLIC_API_URL', None)
         
-        # Определяем расширение файла из file_name
-        file_extension = ""
-        if media.file_name:
-            # Извлекаем расширение из имени файла
-            if '.' in media.file_name:
-                file_extension = "." + media.file_name.rsplit('.', 1)[1].lower()
-                # Проверяем, что это валидное расширение для изображения
-                if file_extension not in ['.jpg', '.jpeg', '.png']:
-                    file_extension = '.jpg'  # Fallback на .jpg
-            else:
-                file_extension = '.jpg'  # Fallback на .jpg
-        else:
-            file_extension = '.jpg'  # Fallback на .jpg
-        
+        # Определяем расширение файла из file_name (fallback на .jpg)
+        ext = os.path.splitext(media.file_name or "")[1].lower()
+        file_extension = ext if ext in _VALID_IMAGE_EXT else ".jpg"
+
+
         if public_api_url:
             # Используем PUBLIC_API_URL с расширением файла
             image_url = f"{public_api_url}/api/v1/media/{media.id}{file_extension}"
@@ -159,6 +191,7 @@ async def animate_photo(
                 # Сохраняем task_id в БД
                 media.animation_task_id = task_id
                 db.commit()
+                _media_cache.pop(request.media_id)
                 increment_animation_usage(current_user, db)
                 return PhotoAnimateResponse(
                     task_id=task_id or "sync",
@@ -184,6 +217,7 @@ async def animate_photo(
 @router.post("/avatar/chat", response_model=AvatarChatResponse)
 async def avatar_chat(
     request: AvatarChatRequest,
+    no_cache: bool = False,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user),
 ):
@@ -198,7 +232,7 @@ async def avatar_chat(
     5. Опционально: сгенерировать аудио через ElevenLabs
     """
     # Проверка существования мемориала
-    memorial = db.query(Memorial).filter(Memorial.id == request.memorial_id).first()
+    memorial = get_memorial_cached(db, request.memorial_id)
     if not memorial:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -255,11 +289,17 @@ async def avatar_chat(
                     rel.relationship_type.value,
                 )
 
-    # Получаем все воспоминания (не только с embeddings)
-    all_memories = db.query(Memory).filter(
-        Memory.memorial_id == request.memorial_id
-    ).all()
-    
+    # Получаем все воспоминания одним запросом (только нужные колонки — id,
+    # title, content, embedding_id) и за один проход делим на "с embedding"
+    # и "без", вместо двух сканирований списка и контрольного SELECT
+    from sqlalchemy.orm import load_only
+    all_memories = (
+        db.query(Memory)
+        .options(load_only(Memory.id, Memory.title, Memory.content, Memory.embedding_id))
+        .filter(Memory.memorial_id == request.memorial_id)
+        .all()
+    )
+
     if not all_memories:
         no_mem_msg = (
             "I don't have any memories yet. Please add some memories so I can answer questions."
@@ -267,107 +307,79 @@ async def avatar_chat(
             "У меня пока нет информации об этом человеке. Пожалуйста, добавьте воспоминания, чтобы я мог отвечать на вопросы."
         )
         return AvatarChatResponse(answer=no_mem_msg, sources=[])
-    
-    # Проверяем, есть ли воспоминания с embeddings
-    # Важно: используем новый запрос к БД, чтобы избежать проблем с кэшем сессии
-    # Сначала проверяем через прямой SQL запрос
-    from sqlalchemy import text
-    result = db.execute(
-        text("SELECT id, embedding_id FROM memories WHERE memorial_id = :memorial_id"),
-        {"memorial_id": request.memorial_id}
-    )
-    memory_embeddings_map = {row[0]: row[1] for row in result}
-    
-    # Теперь проверяем объекты с учетом данных из БД
+
     memories_with_embeddings = []
+    pending = []
     for m in all_memories:
-        # Обновляем объект из БД
-        db.refresh(m)
-        # Также проверяем через прямой запрос
-        db_embedding_id = memory_embeddings_map.get(m.id)
-        
-        # Используем embedding_id из БД, если он есть
-        embedding_id_to_check = db_embedding_id if db_embedding_id else m.embedding_id
-        
-        # Проверяем embedding_id
-        has_embedding = False
-        if embedding_id_to_check:
-            if isinstance(embedding_id_to_check, str):
-                has_embedding = bool(embedding_id_to_check.strip())
-            else:
-                has_embedding = bool(embedding_id_to_check)
-        
-        if has_embedding:
-            # Обновляем объект, если embedding_id был в БД, но не в объекте
-            if db_embedding_id and not m.embedding_id:
-                m.embedding_id = db_embedding_id
+        embedding_id = m.embedding_id
+        if embedding_id and (not isinstance(embedding_id, str) or embedding_id.strip()):
             memories_with_embeddings.append(m)
-    
-    print(f"Total memories: {len(all_memories)}, with embeddings: {len(memories_with_embeddings)}")
-    for m in all_memories:
-        db_emb = memory_embeddings_map.get(m.id)
-        print(f"  Memory {m.id}: obj.embedding_id={repr(m.embedding_id)}, db.embedding_id={repr(db_emb)}")
-    
-    # Если есть воспоминания без embeddings, пытаемся создать их
-    if len(memories_with_embeddings) < len(all_memories):
-        from app.services.ai_tasks import upsert_memory_embedding
-        
-        created = 0
+        else:
+            pending.append(m)
+
+    logger.info(
+        "Memorial %s: %d memories, %d with embeddings",
+        request.memorial_id, len(all_memories), len(memories_with_embeddings),
+    )
+    # Построчная диагностика — только на DEBUG, чтобы не форматировать
+    # N строк на каждый запрос чата
+    if logger.isEnabledFor(logging.DEBUG):
+        for m in all_memories:
+            logger.debug("  Memory %s: embedding_id=%r", m.id, m.embedding_id)
+
+    # Если есть воспоминания без embeddings, создаём их одним батч-запросом:
+    # OpenAI embeddings API принимает список текстов, поэтому N HTTP round-trip'ов
+    # сворачиваются в один, а upsert'ы в векторную БД выполняются параллельно
+    if pending:
+        from app.services.ai_tasks import get_embeddings_batch, upsert_memory_embedding
+
+        created_memories = []
         errors = []
-        for memory in all_memories:
-            # Проверяем, что embedding_id действительно отсутствует
-            has_embedding = False
-            if memory.embedding_id:
-                if isinstance(memory.embedding_id, str):
-                    has_embedding = bool(memory.embedding_id.strip())
-                else:
-                    has_embedding = bool(memory.embedding_id)
-            
-            if not has_embedding:
-                try:
-                    # Используем get_embedding, который уже импортирован в начале функции
-                    embedding = await get_embedding(memory.content)
-                    vector_id = await upsert_memory_embedding(
+        embeddings = []
+        try:
+            embeddings = await get_embeddings_batch([m.content for m in pending])
+        except Exception as e:
+            error_msg = f"Failed to create embeddings batch: {str(e)}"
+            logger.warning("%s", error_msg)
+            errors.append(error_msg)
+
+        if embeddings:
+            upsert_results = await asyncio.gather(
+                *[
+                    upsert_memory_embedding(
                         memory_id=memory.id,
                         memorial_id=request.memorial_id,
                         text=memory.content,
                         embedding=embedding,
-                        title=memory.title
+                        title=memory.title,
                     )
-                    memory.embedding_id = vector_id
-                    created += 1
-                    print(f"Created embedding for memory {memory.id}: {vector_id}")
-                except Exception as e:
-                    error_msg = f"Failed to create embedding for memory {memory.id}: {str(e)}"
-                    print(f"Warning: {error_msg}")
+                    for memory, embedding in zip(pending, embeddings)
+                ],
+                return_exceptions=True,
+            )
+            for memory, vector_id in zip(pending, upsert_results):
+                if isinstance(vector_id, Exception):
+                    error_msg = f"Failed to create embedding for memory {memory.id}: {str(vector_id)}"
+                    logger.warning("%s", error_msg)
                     errors.append(error_msg)
-        
-        if created > 0:
+                else:
+                    memory.embedding_id = vector_id
+                    created_memories.append(memory)
+                    logger.debug("Created embedding for memory %s: %s", memory.id, vector_id)
+
+        if created_memories:
             try:
                 db.commit()
-                print(f"✅ Committed {created} embeddings to database")
-                # Сбрасываем кэш сессии и перезагружаем объекты
-                db.expire_all()
-                # Перезагружаем все объекты из БД
-                for memory in all_memories:
-                    db.refresh(memory)
-                # Пересчитываем список с embeddings
-                memories_with_embeddings = []
-                for m in all_memories:
-                    db.refresh(m)
-                    if m.embedding_id and (isinstance(m.embedding_id, str) and m.embedding_id.strip() or m.embedding_id):
-                        memories_with_embeddings.append(m)
-                print(f"✅ After refresh: {len(memories_with_embeddings)} memories with embeddings")
-            except Exception as commit_error:
-                print(f"❌ ERROR committing embeddings: {commit_error}")
-                import traceback
-                traceback.print_exc()
+                memories_with_embeddings.extend(created_memories)
+                logger.debug("Committed %s embeddings to database", len(created_memories))
+            except Exception:
+                logger.exception("Error committing embeddings")
                 db.rollback()
-        
+
         # Если были ошибки, логируем их
         if errors:
-            print(f"Errors creating embeddings: {errors}")
-    
+            logger.warning("Errors creating embeddings: %s", errors)
+
     # Используем только воспоминания с embeddings для поиска
     memories = memories_with_embeddings
     
@@ -386,7 +398,31 @@ async def avatar_chat(
     try:
         # Создание embedding вопроса
         question_embedding = await get_embedding(request.question)
-        
+
+        # Семантический кэш: перефразировки одного вопроса дают близкие embeddings,
+        # так что готовый ответ (включая аудио) отдаём без OpenAI/ElevenLabs.
+        # ?no_cache=1 — принудительный обход кэша.
+        cache_ns = (
+            request.memorial_id,
+            request.language,
+            bool(request.use_persona),
+            bool(request.include_family_memories),
+        )
+        if not no_cache:
+            cached = chat_answer_cache.get(cache_ns, question_embedding)
+            # Запрос с include_audio не должен получить запись, закэшированную без аудио
+            if cached and (not request.include_audio or cached.get("audio_url")):
+                logger.debug("Semantic cache hit for memorial %s", request.memorial_id)
+                if current_user:
+                    increment_chat_usage(current_user, db)
+                return AvatarChatResponse(
+                    answer=cached["answer"],
+                    audio_url=cached.get("audio_url"),
+                    # В кэше только готовые mp3 (см. put ниже)
+                    audio_status="ready" if cached.get("audio_url") else None,
+                    sources=cached.get("sources", []),
+                )
+
         # Поиск релевантных воспоминаний в векторной БД
         # Понижаем порог для лучшего поиска, особенно для общих вопросов
         similar_memories = await search_similar_memories(
@@ -396,53 +432,82 @@ async def avatar_chat(
             min_score=0.1  # Низкий порог — длинные тексты дают размытые embeddings
         )
         
-        print(f"🔍 Found {len(similar_memories)} similar memories for question: '{request.question}'")
-        for i, mem in enumerate(similar_memories):
-            print(f"  {i+1}. Memory ID: {mem.get('memory_id')}, Score: {mem.get('score', 0):.3f}, Title: {mem.get('title', 'N/A')}")
+        logger.debug(
+            "Found %s similar memories for question: %r",
+            len(similar_memories), request.question,
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, mem in enumerate(similar_memories):
+                logger.debug(
+                    "  %s. Memory ID: %s, Score: %.3f, Title: %s",
+                    i + 1, mem.get("memory_id"), mem.get("score", 0), mem.get("title", "N/A"),
+                )
         
-        # ВАЖНО: Всегда получаем полный текст из БД, так как в векторной БД
-        # текст может быть обрезанным (например, только 1000 символов в Qdrant payload)
+        # Полный текст берём из payload векторной БД, если он там целиком
+        # (upsert_memory_embedding ставит флаг full_text). В БД ходим одним
+        # IN-запросом только за теми hit'ами, чей payload обрезан.
         context_chunks = []
         has_family_context = False
+        hit_memory_ids = [
+            m.get("memory_id")
+            for m in similar_memories
+            if m.get("memory_id") and not (m.get("full_text") and m.get("text"))
+        ]
+        memories_by_id = {}
+        if hit_memory_ids:
+            from sqlalchemy.orm import load_only
+            rows = (
+                db.query(Memory)
+                .options(load_only(Memory.id, Memory.content, Memory.title))
+                .filter(Memory.id.in_(hit_memory_ids))
+                .all()
+            )
+            memories_by_id = {row.id: row for row in rows}
         for mem in similar_memories:
             memory_id = mem.get("memory_id")
             source_memorial_id = mem.get("source_memorial_id")
             if memory_id:
-                # Всегда получаем полный текст из БД для гарантии полноты контекста
-                memory = db.query(Memory).filter(Memory.id == memory_id).first()
-                if memory:
-                    text = memory.content
-                    # Добавляем метку, если воспоминание от родственника
-                    if source_memorial_id and source_memorial_id != request.memorial_id and source_memorial_id in family_memorial_map:
-                        rel_name, rel_type = family_memorial_map[source_memorial_id]
-                        if request.language == "en":
-                            label = f"[From memories of {rel_name} ({rel_type})]: "
-                        else:
-                            label = f"[Из воспоминаний {rel_name} ({rel_type})]: "
-                        text = label + text
-                        has_family_context = True
-                    context_chunks.append({
-                        "text": text,
-                        "memory_id": memory.id,
-                        "score": mem.get("score", 0),
-                        "title": memory.title,
-                        "source_memorial_id": source_memorial_id,
-                    })
-                    print(f"✅ Added context chunk: Memory #{memory.id}, text length: {len(memory.content)} chars")
+                if mem.get("full_text") and mem.get("text"):
+                    # Payload содержит полный текст — поход в БД не нужен
+                    text = mem["text"]
+                    title = mem.get("title")
                 else:
-                    print(f"⚠️ Memory {memory_id} not found in database")
+                    memory = memories_by_id.get(memory_id)
+                    if not memory:
+                        logger.warning("Memory %s not found in database", memory_id)
+                        continue
+                    text = memory.content
+                    title = memory.title
+                # Добавляем метку, если воспоминание от родственника
+                if source_memorial_id and source_memorial_id != request.memorial_id and source_memorial_id in family_memorial_map:
+                    rel_name, rel_type = family_memorial_map[source_memorial_id]
+                    if request.language == "en":
+                        label = f"[From memories of {rel_name} ({rel_type})]: "
+                    else:
+                        label = f"[Из воспоминаний {rel_name} ({rel_type})]: "
+                    text = label + text
+                    has_family_context = True
+                context_chunks.append({
+                    "text": text,
+                    "memory_id": memory_id,
+                    "score": mem.get("score", 0),
+                    "title": title,
+                    "source_memorial_id": source_memorial_id,
+                })
+                logger.debug("Added context chunk: Memory #%s, text length: %s chars", memory_id, len(text))
             elif mem.get("text"):
                 # Fallback: если memory_id нет, используем текст из payload
                 # (но это не должно происходить в нормальной работе)
                 context_chunks.append(mem)
-                print(f"⚠️ Using text from payload (no memory_id): {len(mem.get('text', ''))} chars")
+                logger.debug("Using text from payload (no memory_id): %s chars", len(mem.get("text", "")))
         
         # Fallback: векторный поиск пуст (часто на проде — новый пустой Qdrant/volume при той же Postgres,
         # или порог score отфильтровал всё), хотя воспоминания в БД есть.
         if not context_chunks and all_memories:
-            print(
-                f"⚠️ RAG returned no usable chunks; falling back to DB memories only "
-                f"(memorial_id={request.memorial_id}, count={len(all_memories)})"
+            logger.warning(
+                "RAG returned no usable chunks; falling back to DB memories only "
+                "(memorial_id=%s, count=%s)",
+                request.memorial_id, len(all_memories),
             )
             max_chars = 18000
             used = 0
@@ -463,7 +528,7 @@ async def avatar_chat(
                 used += len(take)
         
         if not context_chunks:
-            print(f"❌ No context chunks after RAG + DB fallback (similar_hits={len(similar_memories)})")
+            logger.warning("No context chunks after RAG + DB fallback (similar_hits=%s)", len(similar_memories))
             no_info_msg = (
                 "I don't have memories about that."
                 if request.language == "en" else
@@ -471,7 +536,7 @@ async def avatar_chat(
             )
             return AvatarChatResponse(answer=no_info_msg, sources=[])
         
-        print(f"📝 Created {len(context_chunks)} context chunks for RAG")
+        logger.debug("Created %s context chunks for RAG", len(context_chunks))
         
         # Smart Avatar Persona Agent: строим системный промпт из всех воспоминаний.
         # Результат кэшируется в Redis на 1 час, чтобы не вызывать GPT-4 каждый раз.
@@ -484,7 +549,7 @@ async def avatar_chat(
                 redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
                 persona_prompt = await redis_client.get(redis_key)
                 if persona_prompt:
-                    print(f"✅ Persona loaded from Redis cache for memorial {request.memorial_id}")
+                    logger.debug("Persona loaded from Redis cache for memorial %s", request.memorial_id)
                 else:
                     persona_prompt = await build_avatar_persona(
                         memories=[{"title": m.title, "content": m.content} for m in all_memories],
@@ -492,10 +557,10 @@ async def avatar_chat(
                         language=request.language,
                     )
                     await redis_client.setex(redis_key, 3600, persona_prompt)
-                    print(f"✅ Persona built and cached in Redis for memorial {request.memorial_id}")
+                    logger.debug("Persona built and cached in Redis for memorial %s", request.memorial_id)
                 await redis_client.aclose()
             except Exception as e:
-                print(f"Warning: Redis unavailable, building persona without cache: {e}")
+                logger.warning("Redis unavailable, building persona without cache: %s", e)
                 try:
                     persona_prompt = await build_avatar_persona(
                         memories=[{"title": m.title, "content": m.content} for m in all_memories],
@@ -503,7 +568,7 @@ async def avatar_chat(
                         language=request.language,
                     )
                 except Exception as e2:
-                    print(f"Warning: Could not build avatar persona: {e2}")
+                    logger.warning("Could not build avatar persona: %s", e2)
 
         # Nickname: если текущий пользователь связан с этим мемориалом и задал обращение
         if current_user:
@@ -555,15 +620,75 @@ async def avatar_chat(
             else:
                 persona_prompt = family_note
 
-        # Генерация ответа через OpenAI с улучшенным RAG
-        answer, source_ids = await generate_rag_response(
-            question=request.question,
-            context_chunks=context_chunks,
-            memorial_name=memorial.name,
-            system_prompt=persona_prompt,
-            language=request.language,
-        )
-        
+        # Выбор голоса до генерации ответа — чтобы конвейер RAG → TTS мог
+        # стартовать озвучку первого предложения, пока модель пишет остальные.
+        # Голос: клон аватара > мужской/женский pre-made > голос по умолчанию
+        voice_id = None
+        audio_error = None
+        if request.include_audio:
+            if memorial.voice_id:
+                voice_id = memorial.voice_id
+            elif getattr(memorial, 'voice_gender', None) == 'male' and settings.ELEVENLABS_VOICE_ID_MALE:
+                voice_id = settings.ELEVENLABS_VOICE_ID_MALE
+            elif getattr(memorial, 'voice_gender', None) == 'female' and settings.ELEVENLABS_VOICE_ID_FEMALE:
+                voice_id = settings.ELEVENLABS_VOICE_ID_FEMALE
+            else:
+                voice_id = settings.ELEVENLABS_VOICE_ID
+            if not voice_id:
+                audio_error = (
+                    "Не задан голос для озвучки: укажите ELEVENLABS_VOICE_ID в backend/.env "
+                    "или загрузите клон голоса аватара."
+                )
+            elif not settings.ELEVENLABS_API_KEY:
+                audio_error = "В backend/.env не задан ELEVENLABS_API_KEY."
+
+        # Генерация ответа через OpenAI с улучшенным RAG.
+        # С include_audio ответ читается потоково по предложениям, и TTS каждого
+        # предложения уходит в ElevenLabs сразу — вместо ожидания полного ответа.
+        answer = None
+        audio_bytes = None
+        if request.include_audio and not audio_error:
+            sentences = []
+            tts_tasks = []
+            try:
+                async for sentence in generate_rag_response_stream(
+                    question=request.question,
+                    context_chunks=context_chunks,
+                    memorial_name=memorial.name,
+                    system_prompt=persona_prompt,
+                    language=request.language,
+                ):
+                    sentences.append(sentence)
+                    tts_tasks.append(asyncio.create_task(
+                        generate_speech_elevenlabs(sentence, voice_id=voice_id)
+                    ))
+                answer = " ".join(sentences)
+                audio_bytes = b"".join(await asyncio.gather(*tts_tasks))
+            except Exception as e:
+                audio_bytes = None
+                for task in tts_tasks:
+                    task.cancel()
+                if answer is None:
+                    # Упал сам стрим — ответ перегенерируется нестриминговым путём
+                    audio_error = str(e)
+                    logger.warning("Streaming RAG+TTS pipeline failed, falling back: %s", e)
+                else:
+                    # Ответ достримился, сломался только TTS: audio_error не ставим,
+                    # озвучку доделает фоновая задача ниже (audio_status=pending,
+                    # клиент заберёт mp3 через /chat/audio/{filename}/status)
+                    logger.warning(
+                        "Per-sentence TTS failed, deferring audio to background task: %s", e
+                    )
+
+        if answer is None:
+            answer, source_ids = await generate_rag_response(
+                question=request.question,
+                context_chunks=context_chunks,
+                memorial_name=memorial.name,
+                system_prompt=persona_prompt,
+                language=request.language,
+            )
+
         # Формируем читаемые источники (язык подписи = язык запроса)
         mem_label = "Memory" if request.language == "en" else "Воспоминание"
         sources = []
@@ -576,40 +701,55 @@ async def avatar_chat(
                     source_text += f": {title}"
                 sources.append(source_text)
         
-        # Опциональная генерация аудио
+        # Опциональная генерация аудио (если конвейер выше уже озвучил ответ —
+        # используем готовые байты, иначе TTS уходит в фоновую Celery-задачу:
+        # текст ответа возвращается сразу, audio_url предсказуем по audio_key,
+        # клиент поллит /chat/audio/{filename}/status до status=ready)
         audio_url = None
-        audio_error = None
-        if request.include_audio:
+        audio_status = None
+        if request.include_audio and not audio_error:
             try:
-                # Голос: клон аватара > мужской/женский pre-made > голос по умолчанию
-                # Pre-made голоса ElevenLabs доступны на бесплатном тарифе без ограничений
-                if memorial.voice_id:
-                    voice_id = memorial.voice_id
-                elif getattr(memorial, 'voice_gender', None) == 'male' and settings.ELEVENLABS_VOICE_ID_MALE:
-                    voice_id = settings.ELEVENLABS_VOICE_ID_MALE
-                elif getattr(memorial, 'voice_gender', None) == 'female' and settings.ELEVENLABS_VOICE_ID_FEMALE:
-                    voice_id = settings.ELEVENLABS_VOICE_ID_FEMALE
-                else:
-                    voice_id = settings.ELEVENLABS_VOICE_ID
-                if not voice_id:
-                    raise ValueError(
-                        "Не задан голос для озвучки: укажите ELEVENLABS_VOICE_ID в backend/.env или загрузите клон голоса аватара."
-                    )
-                if not settings.ELEVENLABS_API_KEY:
-                    raise ValueError("В backend/.env не задан ELEVENLABS_API_KEY.")
-                audio_bytes = await generate_speech_elevenlabs(answer, voice_id=voice_id)
-
-                # Сохранение аудио-файла
+                # Имя файла — по содержимому (голос + текст ответа): встроенный
+                # hash() рандомизирован PYTHONHASHSEED и различается между
+                # процессами, а sha1 стабильна — тот же ответ тем же голосом
+                # переиспользует готовый mp3 без повторного вызова ElevenLabs
+                audio_key = hashlib.sha1(f"{voice_id}|{answer}".encode("utf-8")).hexdigest()[:16]
                 audio_dir = Path("uploads/audio")
                 audio_dir.mkdir(exist_ok=True)
-                audio_filename = f"chat_{request.memorial_id}_{hash(request.question)}.mp3"
+                audio_filename = f"chat_{request.memorial_id}_{audio_key}.mp3"
                 audio_path = audio_dir / audio_filename
 
-                with open(audio_path, "wb") as f:
-                    f.write(audio_bytes)
+                if audio_bytes is not None:
+                    with open(audio_path, "wb") as f:
+                        f.write(audio_bytes)
+                    audio_status = "ready"
+                elif audio_path.exists():
+                    audio_status = "ready"
+                else:
+                    try:
+                        # kombu шлёт задачу в Redis блокирующим сокетом — уводим в поток
+                        await asyncio.to_thread(
+                            generate_tts_task.delay,
+                            answer=answer,
+                            voice_id=voice_id,
+                            memorial_id=request.memorial_id,
+                            audio_key=audio_key,
+                        )
+                        audio_status = "pending"
+                    except Exception as celery_error:
+                        # Fallback: Redis/Celery недоступны — генерируем синхронно
+                        logger.warning(
+                            "Celery unavailable, generating TTS synchronously: %s",
+                            celery_error,
+                        )
+                        audio_bytes = await generate_speech_elevenlabs(answer, voice_id=voice_id)
+                        with open(audio_path, "wb") as f:
+                            f.write(audio_bytes)
+                        audio_status = "ready"
 
-                # URL для воспроизведения в браузере: только HTTP(S) или путь к API (никогда s3://)
-                if settings.USE_S3 and settings.supabase_public_url:
+                # URL для воспроизведения в браузере: только HTTP(S) или путь к API (никогда s3://).
+                # Для pending файла ещё нет — отдаём относительный путь, воркер допишет mp3
+                if audio_status == "ready" and settings.USE_S3 and settings.supabase_public_url:
                     s3_key = f"audio/{audio_filename}"
                     if upload_file_to_s3(audio_path, s3_key, "audio/mpeg"):
                         public_url = get_public_url(s3_key)
@@ -623,14 +763,15 @@ async def avatar_chat(
 
             except Exception as e:
                 audio_error = str(e)
-                print(f"Error generating audio: {e}")
+                logger.error("Error generating audio: %s", e)
 
         # Запуск анимации говорящей головы (async, опционально)
         animation_task_id = None
         animation_provider = None
-        if audio_url and memorial.cover_photo_id:
+        # D-ID скачивает mp3 по URL — стартуем анимацию только когда файл уже записан
+        if audio_url and audio_status == "ready" and memorial.cover_photo_id:
             try:
-                cover_media = db.query(Media).filter(Media.id == memorial.cover_photo_id).first()
+                cover_media = get_media_cached(db, memorial.cover_photo_id)
                 if cover_media:
                     public_image_url = f"{settings.PUBLIC_API_URL}/api/v1/media/{cover_media.id}"
                     # Формируем публичный audio_url для D-ID (нужен абсолютный URL)
@@ -645,10 +786,26 @@ async def avatar_chat(
                     )
                     animation_task_id = anim_result.get("task_id")
                     animation_provider = anim_result.get("provider")
-                    print(f"✅ Animation started: task_id={animation_task_id}, provider={animation_provider}")
+                    logger.debug(
+                        "Animation started: task_id=%s, provider=%s",
+                        animation_task_id, animation_provider,
+                    )
             except Exception as e:
                 # Анимация опциональна — не ломаем чат при ошибке
-                print(f"Warning: could not start animation: {e}")
+                logger.warning("Could not start animation: %s", e)
+
+        # Сохраняем ответ в семантический кэш для близких перефразировок вопроса.
+        # audio_url кладём только при status=ready: pending-файл воркер мог ещё
+        # не записать (или задача упала), и хит отдал бы битую ссылку весь TTL
+        chat_answer_cache.put(
+            cache_ns,
+            question_embedding,
+            {
+                "answer": answer,
+                "audio_url": audio_url if audio_status == "ready" else None,
+                "sources": sources,
+            },
+        )
 
         # Increment quota counter for authenticated users
         if current_user:
@@ -657,6 +814,7 @@ async def avatar_chat(
         return AvatarChatResponse(
             answer=answer,
             audio_url=audio_url,
+            audio_status=audio_status,
             audio_error=audio_error,
             animation_task_id=animation_task_id,
             animation_provider=animation_provider,
@@ -704,6 +862,33 @@ async def avatar_chat(
         )
 
 
+@router.get("/chat/audio/{audio_filename}/status")
+async def get_chat_audio_status(audio_filename: str):
+    """
+    Статус фоновой генерации озвучки ответа чата.
+
+    Возвращает ready, когда generate_tts_task записал mp3 по предсказанному
+    в avatar_chat пути; до этого — pending.
+    """
+    # Имя файла формирует только avatar_chat — отклоняем всё, что не похоже
+    if (
+        "/" in audio_filename
+        or "\\" in audio_filename
+        or ".." in audio_filename
+        or not audio_filename.endswith(".mp3")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid audio filename"
+        )
+
+    audio_path = Path("uploads/audio") / audio_filename
+    return {
+        "audio_filename": audio_filename,
+        "status": "ready" if audio_path.exists() else "pending",
+    }
+
+
 @router.post("/animation/status", response_model=AnimationStatusResponse)
 async def get_animation_status_endpoint(
     request: AnimationStatusRequest,
@@ -735,7 +920,7 @@ async def get_animation_status_endpoint(
     
     # Если указан media_id, используем его для поиска
     if request.media_id:
-        media = db.query(Media).filter(Media.id == request.media_id).first()
+        media = get_media_cached(db, request.media_id)
         if media and media.animation_task_id:
             video_id = media.animation_task_id
             print(f"Using media_id={request.media_id}, found video_id in DB: {video_id}")
@@ -821,7 +1006,7 @@ async def upload_voice(
     """
     check_tts_access(current_user)
     # Проверка существования мемориала
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
+    memorial = get_memorial_cached(db, memorial_id)
     if not memorial:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -844,11 +1029,12 @@ async def upload_voice(
     temp_path = voice_dir / temp_filename
     
     try:
-        # Сохраняем файл
-        with open(temp_path, "wb") as f:
-            content = await audio_file.read()
-            f.write(content)
-        
+        # Потоковое сохранение: пишем чанками по 1 МБ, не буферизуя весь файл
+        # (голосовой образец может быть 10+ МБ WAV) в памяти
+        async with aiofiles.open(temp_path, "wb") as f:
+            while chunk := await audio_file.read(1 << 20):
+                await f.write(chunk)
+
         # Создаем кастомный голос в ElevenLabs
         voice_name_final = voice_name or f"{memorial.name} Voice"
         voice_id = await create_custom_voice_elevenlabs(
@@ -861,6 +1047,7 @@ async def upload_voice(
         memorial.voice_id = voice_id
         db.commit()
         db.refresh(memorial)
+        _memorial_cache.pop(memorial_id)
         
         # Удаляем временный файл
         if temp_path.exists():
@@ -995,9 +1182,7 @@ async def start_live_avatar_session(
     Actual live video infrastructure (WebRTC / D-ID Live) must be integrated separately.
     Returns a session_id that the client uses to initiate the video stream.
     """
-    memorial = db.query(Memorial).filter(Memorial.id == request.memorial_id).first()
-    if not memorial:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Memorial not found")
+    ensure_memorial_exists(db, request.memorial_id)
 
     check_live_session_quota(current_user, db)
     increment_live_session_usage(current_user, db)
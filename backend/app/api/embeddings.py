@@ -1,23 +1,34 @@
 """
 API endpoints для управления embeddings воспоминаний.
 """
+import hashlib
+
 from fastapi import APIRouter, Depends, HTTPException, Header, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
 from typing import List, Optional
 
 from app.config import settings
-from app.db import get_db
+from app.db import get_db, get_async_db
 from app.models import Memory, Memorial
 from app.services.ai_tasks import (
     get_embedding,
     upsert_memory_embedding,
     delete_memory_embedding,
 )
-from app.workers.worker import create_memory_embedding_task
+from app.workers.worker import (
+    create_memory_embedding_task,
+    batch_create_memory_embeddings_task,
+)
 from app.schemas import MemoryResponse
+from celery import group
 
 router = APIRouter(prefix="/embeddings", tags=["embeddings"])
 
+# Размер батча для batch_create_memory_embeddings_task (один запрос к OpenAI на батч)
+MAX_EMBEDDING_BATCH = 64
+
 
 def _require_admin_key(x_admin_key: Optional[str] = Header(default=None)):
     """Simple admin key check for maintenance endpoints."""
@@ -106,30 +117,53 @@ async def recreate_all_memorial_embeddings(
     """
     Пересоздать embeddings для всех воспоминаний мемориала.
     """
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
-    if not memorial:
+    memorial_exists = db.query(Memorial.id).filter(Memorial.id == memorial_id).first()
+    if not memorial_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Memorial not found"
         )
-    
-    memories = db.query(Memory).filter(Memory.memorial_id == memorial_id).all()
-    
-    task_ids = []
-    for memory in memories:
-        task = create_memory_embedding_task.delay(
-            memory_id=memory.id,
-            memorial_id=memorial_id,
-            text=memory.content
-        )
-        task_ids.append(task.id)
-    
+
+    # Для диспатча нужны только id и content — не гидрируем остальные колонки
+    memories = (
+        db.query(Memory)
+        .options(load_only(Memory.id, Memory.content))
+        .filter(Memory.memorial_id == memorial_id)
+        .all()
+    )
+
+    # Дедупликация по хэшу контента: одинаковые тексты (скопированные
+    # воспоминания, массовые импорты) получают один запрос к OpenAI на всех,
+    # вектор затем апсертится для каждого memory_id.
+    unique_texts = {}  # sha256(content) -> [memory_ids, text]
+    for m in memories:
+        key = hashlib.sha256((m.content or "").encode("utf-8")).hexdigest()
+        if key in unique_texts:
+            unique_texts[key][0].append(m.id)
+        else:
+            unique_texts[key] = [[m.id], m.content]
+    items = list(unique_texts.values())
+
+    # Вместо отдельного .delay() (и отдельного RPUSH в Redis) на каждое
+    # воспоминание — один celery group из батч-задач: уникальные тексты режутся
+    # на пачки по MAX_EMBEDDING_BATCH, каждая пачка делает один запрос к OpenAI.
+    chunks = [
+        items[i:i + MAX_EMBEDDING_BATCH]
+        for i in range(0, len(items), MAX_EMBEDDING_BATCH)
+    ]
+    job = group(
+        batch_create_memory_embeddings_task.s(memorial_id, chunk)
+        for chunk in chunks
+    ).apply_async()
+
     return {
         "status": "queued",
         "memorial_id": memorial_id,
         "memories_count": len(memories),
-        "task_ids": task_ids,
-        "message": f"Queued {len(memories)} embedding recreation tasks"
+        "unique_texts": len(items),
+        "group_id": job.id,
+        "task_ids": [r.id for r in job.results] if job.results else [],
+        "message": f"Queued {len(memories)} memories ({len(items)} unique texts) in {len(chunks)} embedding batch(es)"
     }
 
 
@@ -176,23 +210,36 @@ async def delete_memory_embedding_endpoint(
 @router.get("/memorials/{memorial_id}/status")
 async def get_embeddings_status(
     memorial_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Получить статус embeddings для мемориала.
     Показывает сколько воспоминаний имеют embeddings.
+
+    Read-only эндпоинт на AsyncSession — запросы к БД не блокируют event loop.
     """
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
-    if not memorial:
+    memorial_exists = (
+        await db.execute(select(Memorial.id).where(Memorial.id == memorial_id))
+    ).scalar_one_or_none()
+    if memorial_exists is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Memorial not found"
         )
-    
-    memories = db.query(Memory).filter(Memory.memorial_id == memorial_id).all()
-    
-    total = len(memories)
-    with_embeddings = sum(1 for m in memories if m.embedding_id)
+
+    # Агрегаты на стороне БД вместо загрузки строк: один round-trip,
+    # O(1) байт по сети независимо от числа воспоминаний
+    total, with_embeddings = (
+        await db.execute(
+            select(
+                func.count(Memory.id),
+                func.count(Memory.id).filter(
+                    Memory.embedding_id.isnot(None),
+                    Memory.embedding_id != "",
+                ),
+            ).where(Memory.memorial_id == memorial_id)
+        )
+    ).one()
     without_embeddings = total - with_embeddings
     
     return {
@@ -5,7 +5,9 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Dict, Set, Optional, Tuple
 from collections import defaultdict
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, delete, or_, select, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app.auth import get_current_user, get_optional_user, require_memorial_access
 from app.db import get_db
@@ -14,8 +16,6 @@ from app.schemas import (
     FamilyRelationshipCreate,
     FamilyRelationshipUpdate,
     FamilyRelationshipResponse,
-    FamilyTreeResponse,
-    FamilyTreeNode,
     ConnectionStep,
     HiddenConnection,
     HiddenConnectionsResponse,
@@ -30,6 +30,22 @@ from app.schemas import (
 
 router = APIRouter(prefix="/family", tags=["family"])
 
+# Таблица обратных связей: (тип → обратный тип; симметричные — тот же тип).
+# CUSTOM отсутствует — обратная связь для него не создаётся автоматически.
+_REVERSE_TYPE = {
+    RelationshipType.PARENT:          RelationshipType.CHILD,
+    RelationshipType.CHILD:           RelationshipType.PARENT,
+    RelationshipType.STEP_PARENT:     RelationshipType.STEP_CHILD,
+    RelationshipType.STEP_CHILD:      RelationshipType.STEP_PARENT,
+    RelationshipType.ADOPTIVE_PARENT: RelationshipType.ADOPTIVE_CHILD,
+    RelationshipType.ADOPTIVE_CHILD:  RelationshipType.ADOPTIVE_PARENT,
+    RelationshipType.SPOUSE:          RelationshipType.SPOUSE,
+    RelationshipType.EX_SPOUSE:       RelationshipType.EX_SPOUSE,
+    RelationshipType.PARTNER:         RelationshipType.PARTNER,
+    RelationshipType.SIBLING:         RelationshipType.SIBLING,
+    RelationshipType.HALF_SIBLING:    RelationshipType.HALF_SIBLING,
+}
+
 
 def _norm_rel_type(rel_type) -> str:
     return str(rel_type or "").lower()
@@ -252,15 +268,15 @@ async def create_relationship(
     """
     require_memorial_access(memorial_id, current_user, db, min_role=UserRole.EDITOR)
 
-    # Проверка существования мемориалов
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
+    # Проверка существования мемориалов (db.get: PK-lookup через identity map)
+    memorial = db.get(Memorial, memorial_id)
     if not memorial:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Memorial not found"
         )
-    
-    related_memorial = db.query(Memorial).filter(Memorial.id == relationship.related_memorial_id).first()
+
+    related_memorial = db.get(Memorial, relationship.related_memorial_id)
     if not related_memorial:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -274,19 +290,6 @@ async def create_relationship(
             detail="Cannot create relationship with itself"
         )
     
-    # Проверка на дубликат
-    existing = db.query(FamilyRelationship).filter(
-        FamilyRelationship.memorial_id == memorial_id,
-        FamilyRelationship.related_memorial_id == relationship.related_memorial_id,
-        FamilyRelationship.relationship_type == relationship.relationship_type
-    ).first()
-    
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Relationship already exists"
-        )
-    
     # Валидация: для CUSTOM типа обязателен custom_label
     if relationship.relationship_type == RelationshipType.CUSTOM and not relationship.custom_label:
         raise HTTPException(
@@ -294,66 +297,178 @@ async def create_relationship(
             detail="custom_label is required for relationship_type=custom"
         )
 
-    # Создание связи
-    db_relationship = FamilyRelationship(
+    # Создание связи (и авто-обратной) одним multi-VALUES INSERT через Core
+    # с ON CONFLICT DO NOTHING по uq_relationship: дубликаты отсекаются атомарно
+    # в самом INSERT — ни отдельного SELECT-раунда, ни TOCTOU-гонки между проверкой и вставкой
+    rows = [dict(
         memorial_id=memorial_id,
         related_memorial_id=relationship.related_memorial_id,
         relationship_type=relationship.relationship_type,
         custom_label=relationship.custom_label,
         notes=relationship.notes,
         nickname_for_visitor=relationship.nickname_for_visitor,
-    )
-    db.add(db_relationship)
-
-    # Таблица обратных связей: (тип → обратный тип, симметричная?)
-    REVERSE_MAP = {
-        RelationshipType.PARENT:          RelationshipType.CHILD,
-        RelationshipType.CHILD:           RelationshipType.PARENT,
-        RelationshipType.STEP_PARENT:     RelationshipType.STEP_CHILD,
-        RelationshipType.STEP_CHILD:      RelationshipType.STEP_PARENT,
-        RelationshipType.ADOPTIVE_PARENT: RelationshipType.ADOPTIVE_CHILD,
-        RelationshipType.ADOPTIVE_CHILD:  RelationshipType.ADOPTIVE_PARENT,
-        # Симметричные (обратный = тот же тип)
-        RelationshipType.SPOUSE:          RelationshipType.SPOUSE,
-        RelationshipType.EX_SPOUSE:       RelationshipType.EX_SPOUSE,
-        RelationshipType.PARTNER:         RelationshipType.PARTNER,
-        RelationshipType.SIBLING:         RelationshipType.SIBLING,
-        RelationshipType.HALF_SIBLING:    RelationshipType.HALF_SIBLING,
-        # CUSTOM — обратная не создаётся автоматически
-    }
+    )]
 
-    reverse_type = REVERSE_MAP.get(relationship.relationship_type)
+    reverse_type = _REVERSE_TYPE.get(relationship.relationship_type)
     if reverse_type is not None:
-        # Проверяем, что обратная связь ещё не существует
-        reverse_exists = db.query(FamilyRelationship).filter(
-            FamilyRelationship.memorial_id == relationship.related_memorial_id,
-            FamilyRelationship.related_memorial_id == memorial_id,
-            FamilyRelationship.relationship_type == reverse_type
-        ).first()
-        if not reverse_exists:
-            db.add(FamilyRelationship(
-                memorial_id=relationship.related_memorial_id,
-                related_memorial_id=memorial_id,
-                relationship_type=reverse_type,
-                custom_label=relationship.custom_label,
-                notes=relationship.notes
-            ))
+        # Уже существующую обратную связь отсечёт ON CONFLICT — проверка не нужна
+        rows.append(dict(
+            memorial_id=relationship.related_memorial_id,
+            related_memorial_id=memorial_id,
+            relationship_type=reverse_type,
+            custom_label=relationship.custom_label,
+            notes=relationship.notes,
+            nickname_for_visitor=None,
+        ))
 
+    # on_conflict_do_nothing есть только в диалектных Insert (dev — SQLite, прод — Postgres)
+    insert_fn = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    inserted = db.execute(
+        insert_fn(FamilyRelationship)
+        .values(rows)
+        .on_conflict_do_nothing(
+            index_elements=["memorial_id", "related_memorial_id", "relationship_type"]
+        )
+        .returning(
+            FamilyRelationship.id,
+            FamilyRelationship.memorial_id,
+            FamilyRelationship.created_at,
+        )
+    ).all()
+    # RETURNING отдаёт только реально вставленные строки: нет прямой — это дубликат
+    forward = next((row for row in inserted if row.memorial_id == memorial_id), None)
+    if forward is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Relationship already exists"
+        )
     db.commit()
-    db.refresh(db_relationship)
+    new_id, created_at = forward.id, forward.created_at
 
     return FamilyRelationshipResponse(
-        id=db_relationship.id,
-        memorial_id=db_relationship.memorial_id,
-        related_memorial_id=db_relationship.related_memorial_id,
-        relationship_type=db_relationship.relationship_type,
-        custom_label=db_relationship.custom_label,
-        notes=db_relationship.notes,
+        id=new_id,
+        memorial_id=memorial_id,
+        related_memorial_id=relationship.related_memorial_id,
+        relationship_type=relationship.relationship_type,
+        custom_label=relationship.custom_label,
+        notes=relationship.notes,
         related_memorial_name=related_memorial.name,
-        created_at=db_relationship.created_at
+        created_at=created_at
     )
 
 
+@router.post(
+    "/memorials/{memorial_id}/relationships/batch",
+    response_model=List[FamilyRelationshipResponse],
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_relationships_batch(
+    memorial_id: int,
+    relationships: List[FamilyRelationshipCreate],
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """
+    Создать несколько семейных связей одним запросом (импорт дерева).
+
+    Вместо N отдельных POST /relationships — один multi-VALUES INSERT
+    (прямые + автообратные связи) и один commit. Дубликаты (в том числе
+    внутри самого батча) молча отсекаются через ON CONFLICT DO NOTHING;
+    в ответе — только реально созданные прямые связи.
+    """
+    require_memorial_access(memorial_id, current_user, db, min_role=UserRole.EDITOR)
+
+    if not db.get(Memorial, memorial_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Memorial not found"
+        )
+
+    if not relationships:
+        return []
+
+    related_ids = {r.related_memorial_id for r in relationships}
+    if memorial_id in related_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot create relationship with itself"
+        )
+
+    # Существование всех related-мемориалов + имена для ответа одним IN-запросом
+    related_names = dict(
+        db.query(Memorial.id, Memorial.name).filter(Memorial.id.in_(related_ids)).all()
+    )
+    missing = related_ids - related_names.keys()
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Related memorials not found: {sorted(missing)}"
+        )
+
+    rows = []
+    by_key = {}
+    for r in relationships:
+        if r.relationship_type == RelationshipType.CUSTOM and not r.custom_label:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="custom_label is required for relationship_type=custom"
+            )
+        by_key[(r.related_memorial_id, r.relationship_type)] = r
+        rows.append(dict(
+            memorial_id=memorial_id,
+            related_memorial_id=r.related_memorial_id,
+            relationship_type=r.relationship_type,
+            custom_label=r.custom_label,
+            notes=r.notes,
+            nickname_for_visitor=r.nickname_for_visitor,
+        ))
+        reverse_type = _REVERSE_TYPE.get(r.relationship_type)
+        if reverse_type is not None:
+            rows.append(dict(
+                memorial_id=r.related_memorial_id,
+                related_memorial_id=memorial_id,
+                relationship_type=reverse_type,
+                custom_label=r.custom_label,
+                notes=r.notes,
+                nickname_for_visitor=None,
+            ))
+
+    insert_fn = pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    inserted = db.execute(
+        insert_fn(FamilyRelationship)
+        .values(rows)
+        .on_conflict_do_nothing(
+            index_elements=["memorial_id", "related_memorial_id", "relationship_type"]
+        )
+        .returning(
+            FamilyRelationship.id,
+            FamilyRelationship.memorial_id,
+            FamilyRelationship.related_memorial_id,
+            FamilyRelationship.relationship_type,
+            FamilyRelationship.created_at,
+        )
+    ).all()
+    db.commit()
+
+    responses = []
+    for row in inserted:
+        if row.memorial_id != memorial_id:
+            continue  # автообратная связь — в ответ не включаем
+        src = by_key[(row.related_memorial_id, row.relationship_type)]
+        responses.append(FamilyRelationshipResponse(
+            id=row.id,
+            memorial_id=memorial_id,
+            related_memorial_id=row.related_memorial_id,
+            relationship_type=row.relationship_type,
+            custom_label=src.custom_label,
+            notes=src.notes,
+            related_memorial_name=related_names[row.related_memorial_id],
+            created_at=row.created_at,
+        ))
+    return responses
+
+
 @router.get("/memorials/{memorial_id}/relationships", response_model=List[FamilyRelationshipResponse])
 async def get_relationships(
     memorial_id: int,
@@ -374,23 +489,15 @@ async def get_relationships(
             detail="Memorial not found"
         )
     
-    query = db.query(FamilyRelationship).filter(
+    # Один JOIN вместо запроса связей + bulk-load имён вторым запросом
+    query = db.query(FamilyRelationship, Memorial.name).join(
+        Memorial, Memorial.id == FamilyRelationship.related_memorial_id
+    ).filter(
         FamilyRelationship.memorial_id == memorial_id
     )
-    
+
     if relationship_type:
         query = query.filter(FamilyRelationship.relationship_type == relationship_type)
-    
-    relationships = query.all()
-
-    # Bulk-load связанных мемориалов — один запрос вместо N
-    related_ids = {rel.related_memorial_id for rel in relationships}
-    memorials_by_id = {}
-    if related_ids:
-        memorials_by_id = {
-            m.id: m
-            for m in db.query(Memorial).filter(Memorial.id.in_(related_ids)).all()
-        }
 
     return [
         FamilyRelationshipResponse(
@@ -400,10 +507,10 @@ async def get_relationships(
             relationship_type=rel.relationship_type,
             custom_label=rel.custom_label,
             notes=rel.notes,
-            related_memorial_name=memorials_by_id.get(rel.related_memorial_id, Memorial()).name,
+            related_memorial_name=related_name,
             created_at=rel.created_at,
         )
-        for rel in relationships
+        for rel, related_name in query.all()
     ]
 
 
@@ -417,7 +524,7 @@ async def delete_relationship(
     Удалить семейную связь.
     Автоматически удаляет обратную связь, если она была создана автоматически.
     """
-    relationship = db.query(FamilyRelationship).filter(FamilyRelationship.id == relationship_id).first()
+    relationship = db.get(FamilyRelationship, relationship_id)
     if not relationship:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -427,32 +534,20 @@ async def delete_relationship(
     # Проверяем EDITOR доступ к мемориалу связи
     require_memorial_access(relationship.memorial_id, current_user, db, min_role=UserRole.EDITOR)
     
-    # Удаление обратной связи
-    DELETE_REVERSE_MAP = {
-        RelationshipType.PARENT:          RelationshipType.CHILD,
-        RelationshipType.CHILD:           RelationshipType.PARENT,
-        RelationshipType.STEP_PARENT:     RelationshipType.STEP_CHILD,
-        RelationshipType.STEP_CHILD:      RelationshipType.STEP_PARENT,
-        RelationshipType.ADOPTIVE_PARENT: RelationshipType.ADOPTIVE_CHILD,
-        RelationshipType.ADOPTIVE_CHILD:  RelationshipType.ADOPTIVE_PARENT,
-        RelationshipType.SPOUSE:          RelationshipType.SPOUSE,
-        RelationshipType.EX_SPOUSE:       RelationshipType.EX_SPOUSE,
-        RelationshipType.PARTNER:         RelationshipType.PARTNER,
-        RelationshipType.SIBLING:         RelationshipType.SIBLING,
-        RelationshipType.HALF_SIBLING:    RelationshipType.HALF_SIBLING,
-    }
-    reverse_type = DELETE_REVERSE_MAP.get(relationship.relationship_type)
-    
-    if reverse_type:
-        reverse = db.query(FamilyRelationship).filter(
-            FamilyRelationship.memorial_id == relationship.related_memorial_id,
-            FamilyRelationship.related_memorial_id == relationship.memorial_id,
-            FamilyRelationship.relationship_type == reverse_type
-        ).first()
-        if reverse:
-            db.delete(reverse)
-    
-    db.delete(relationship)
+    # Прямая + обратная связь одним DELETE: без отдельного SELECT обратной
+    # и двух ORM-delete (4 statement'а → 1)
+    reverse_type = _REVERSE_TYPE.get(relationship.relationship_type)
+    condition = FamilyRelationship.id == relationship_id
+    if reverse_type is not None:
+        condition = or_(
+            condition,
+            and_(
+                FamilyRelationship.memorial_id == relationship.related_memorial_id,
+                FamilyRelationship.related_memorial_id == relationship.memorial_id,
+                FamilyRelationship.relationship_type == reverse_type,
+            ),
+        )
+    db.execute(delete(FamilyRelationship).where(condition))
     db.commit()
 
     return None
@@ -466,7 +561,7 @@ async def update_relationship(
     db: Session = Depends(get_db),
 ):
     """Обновить семейную связь (nickname_for_visitor, notes, custom_label)."""
-    relationship = db.query(FamilyRelationship).filter(FamilyRelationship.id == relationship_id).first()
+    relationship = db.get(FamilyRelationship, relationship_id)
     if not relationship:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Relationship not found")
 
@@ -478,13 +573,16 @@ async def update_relationship(
     db.commit()
     db.refresh(relationship)
 
-    related = db.query(Memorial).filter(Memorial.id == relationship.related_memorial_id).first()
-    response = FamilyRelationshipResponse.model_validate(relationship)
-    response.related_memorial_name = related.name if related else None
-    return response
+    related = db.get(Memorial, relationship.related_memorial_id)
+    return FamilyRelationshipResponse.from_orm_fast(
+        relationship,
+        related_memorial_name=related.name if related else None,
+    )
 
 
-@router.get("/memorials/{memorial_id}/tree", response_model=FamilyTreeResponse)
+# response_model намеренно не указан: узлы — готовые dict'ы в форме
+# FamilyTreeNode, повторная валидация ответа свела бы экономию на нет
+@router.get("/memorials/{memorial_id}/tree")
 async def get_family_tree(
     memorial_id: int,
     max_depth: int = 3,
@@ -504,92 +602,119 @@ async def get_family_tree(
             detail="Memorial not found"
         )
     
-    # --- Bulk-load all data for the tree (3 DB queries total) ---
-    # BFS to discover all node IDs within max_depth
+    # --- Bulk-load all data for the tree ---
+    # Рекурсивный CTE (WITH RECURSIVE): весь обход выполняет сама БД одним
+    # запросом независимо от размера дерева — вместо батч-запроса на каждый
+    # уровень глубины. Дерево рендерит только CHILD/PARENT/SPOUSE, остальные
+    # типы связей не запрашиваем вовсе. depth — глубина ИСХОДНОГО узла ребра,
+    # так что цели последнего уровня попадают в выборку, а их рёбра — уже нет.
+    tree_rel_types = [RelationshipType.CHILD, RelationshipType.PARENT, RelationshipType.SPOUSE]
+    walk = (
+        select(
+            FamilyRelationship.memorial_id,
+            FamilyRelationship.related_memorial_id,
+            FamilyRelationship.relationship_type,
+            literal(0).label("depth"),
+        )
+        .where(
+            FamilyRelationship.memorial_id == memorial_id,
+            FamilyRelationship.relationship_type.in_(tree_rel_types),
+        )
+        .cte("tree_walk", recursive=True)
+    )
+    walk = walk.union(
+        select(
+            FamilyRelationship.memorial_id,
+            FamilyRelationship.related_memorial_id,
+            FamilyRelationship.relationship_type,
+            (walk.c.depth + 1).label("depth"),
+        ).where(
+            FamilyRelationship.memorial_id == walk.c.related_memorial_id,
+            FamilyRelationship.relationship_type.in_(tree_rel_types),
+            walk.c.depth + 1 <= max_depth - 1,
+        )
+    )
+    edge_rows = db.execute(
+        select(walk.c.memorial_id, walk.c.related_memorial_id, walk.c.relationship_type)
+    ).all()
+
+    # Один и тот же ряд может прийти на разных глубинах — дедуплицируем рёбра
     all_ids: Set[int] = {memorial_id}
-    frontier: Set[int] = {memorial_id}
-    depth_map: Dict[int, int] = {memorial_id: 0}
-
-    while frontier:
-        rels_batch = db.query(FamilyRelationship).filter(
-            FamilyRelationship.memorial_id.in_(frontier)
-        ).all()
-        new_ids: Set[int] = set()
-        for rel in rels_batch:
-            if rel.related_memorial_id not in all_ids:
-                new_depth = depth_map[rel.memorial_id] + 1
-                if new_depth <= max_depth:
-                    new_ids.add(rel.related_memorial_id)
-                    depth_map[rel.related_memorial_id] = new_depth
-        all_ids.update(new_ids)
-        frontier = new_ids
+    unique_edges: Set[tuple] = set()
+    for source_id, target_id, rel_type in edge_rows:
+        all_ids.add(source_id)
+        all_ids.add(target_id)
+        unique_edges.add((source_id, target_id, rel_type))
 
     memorials_map: Dict[int, Memorial] = {
         m.id: m for m in db.query(Memorial).filter(Memorial.id.in_(all_ids)).all()
     }
-    all_rels = db.query(FamilyRelationship).filter(
-        FamilyRelationship.memorial_id.in_(all_ids)
-    ).all()
 
     children_map: Dict[int, List[int]] = defaultdict(list)
     spouse_map: Dict[int, List[int]] = defaultdict(list)
-    for rel in all_rels:
-        if rel.relationship_type == RelationshipType.CHILD:
-            # memorial_id is parent, related_memorial_id is child
-            children_map[rel.memorial_id].append(rel.related_memorial_id)
-        elif rel.relationship_type == RelationshipType.PARENT:
-            # memorial_id is child, related_memorial_id is parent → parent has memorial as child
-            children_map[rel.related_memorial_id].append(rel.memorial_id)
-        elif rel.relationship_type == RelationshipType.SPOUSE:
-            spouse_map[rel.memorial_id].append(rel.related_memorial_id)
-
-    def build_tree(node_id: int, depth: int, visited: Set[int]) -> Optional[FamilyTreeNode]:
+    for source_id, target_id, rel_type in sorted(unique_edges, key=lambda e: (e[0], e[1])):
+        if rel_type == RelationshipType.CHILD:
+            # source — родитель, target — ребёнок
+            children_map[source_id].append(target_id)
+        elif rel_type == RelationshipType.PARENT:
+            # source — ребёнок, target — родитель → у родителя source в детях
+            children_map[target_id].append(source_id)
+        elif rel_type == RelationshipType.SPOUSE:
+            spouse_map[source_id].append(target_id)
+
+    # Узлы — plain dict в форме FamilyTreeNode: пропускаем Pydantic-валидацию
+    # на каждом узле (O(N) коэрций на больших деревьях) и отдаём структуру
+    # напрямую в orjson
+    # Счётчик узлов ведём прямо при построении — второй обход не нужен
+    total_nodes = 0
+
+    def build_tree(node_id: int, depth: int, visited: Set[int]) -> Optional[dict]:
+        nonlocal total_nodes
         if depth > max_depth or node_id in visited:
             return None
-        visited = visited | {node_id}
 
         m = memorials_map.get(node_id)
         if not m:
             return None
 
+        # Один общий set с откатом после ветки вместо копии на каждый вызов:
+        # семантика та же (узел не повторяется на пути, но может встретиться
+        # в другой ветке), а аллокаций — O(глубины), не O(рёбер)
+        visited.add(node_id)
         children = []
         for child_id in children_map.get(node_id, []):
             child_node = build_tree(child_id, depth + 1, visited)
             if child_node:
                 children.append(child_node)
+        visited.discard(node_id)
 
         spouses = []
         for spouse_id in spouse_map.get(node_id, []):
             sm = memorials_map.get(spouse_id)
             if sm:
-                spouses.append(FamilyTreeNode(
-                    memorial_id=sm.id,
-                    name=sm.name,
-                    birth_date=sm.birth_date,
-                    death_date=sm.death_date,
-                    relationship_type=RelationshipType.SPOUSE,
-                    cover_photo_id=sm.cover_photo_id,
-                    children=[],
-                    spouses=[]
-                ))
-
-        return FamilyTreeNode(
-            memorial_id=m.id,
-            name=m.name,
-            birth_date=m.birth_date,
-            death_date=m.death_date,
-            cover_photo_id=m.cover_photo_id,
-            children=children,
-            spouses=spouses
-        )
-
-    def count_nodes(node: FamilyTreeNode) -> int:
-        count = 1
-        for child in node.children:
-            count += count_nodes(child)
-        for spouse in node.spouses:
-            count += 1
-        return count
+                total_nodes += 1
+                spouses.append({
+                    "memorial_id": sm.id,
+                    "name": sm.name,
+                    "birth_date": sm.birth_date,
+                    "death_date": sm.death_date,
+                    "relationship_type": RelationshipType.SPOUSE.value,
+                    "cover_photo_id": sm.cover_photo_id,
+                    "children": [],
+                    "spouses": [],
+                })
+
+        total_nodes += 1
+        return {
+            "memorial_id": m.id,
+            "name": m.name,
+            "birth_date": m.birth_date,
+            "death_date": m.death_date,
+            "relationship_type": None,
+            "cover_photo_id": m.cover_photo_id,
+            "children": children,
+            "spouses": spouses,
+        }
 
     root = build_tree(memorial_id, 0, set())
     if not root:
@@ -597,13 +722,8 @@ async def get_family_tree(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to build family tree"
         )
-    
-    total_nodes = count_nodes(root)
 
-    return FamilyTreeResponse(
-        root=root,
-        total_nodes=total_nodes
-    )
+    return {"root": root, "total_nodes": total_nodes}
 
 
 @router.get("/memorials/{memorial_id}/full-tree", response_model=FullFamilyTreeResponse)
@@ -1,15 +1,18 @@
 """
 Health check endpoint.
 """
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
 
 router = APIRouter()
 
+# Liveness-пробы ходят сюда постоянно — ответ не меняется, считаем его один раз.
+_HEALTH_BODY = b'{"status":"ok","service":"memorial-mvp"}'
+
 
 @router.get("/health/")
-async def health_check():
+def health_check():
     """
     Проверка работоспособности сервиса.
     """
-    return {"status": "ok", "service": "memorial-mvp"}
+    return Response(content=_HEALTH_BODY, media_type="application/json")
 
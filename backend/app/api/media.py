@@ -1,26 +1,99 @@
 """
 API endpoints для работы с медиа-файлами (получение, статический сервинг).
 """
-from fastapi import APIRouter, HTTPException, status, Response
+from dataclasses import dataclass
+from fastapi import APIRouter, HTTPException, Request, status, Response
 from fastapi.responses import FileResponse, RedirectResponse
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 import mimetypes
+import os
+import re
 
-from app.db import get_db
+# Инициализируем таблицы mimetypes на импорте, чтобы первый запрос не платил за это
+mimetypes.init()
+
+from app.db import get_async_db
 from app.i18n import get_lang, tr
 from app.models import Media
 from app.config import settings
-from app.services.s3_service import get_public_url
-from sqlalchemy.orm import Session
+from app.services.s3_service import get_public_url, get_presigned_download_url_cached
+from app.ttl_cache import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 
 router = APIRouter(prefix="/media", tags=["media"])
 
+# "10" или "10.jpg" — id и опциональное короткое расширение, одним match
+_MEDIA_ID_RE = re.compile(r"^(\d+)(?:\.[A-Za-z0-9]{1,8})?$")
+
+
+@dataclass(frozen=True)
+class _MediaRow:
+    """Неизменяемый срез строки Media — всё, что нужно для сервинга файла."""
+    id: int
+    memorial_id: int
+    file_path: str
+    file_url: Optional[str]
+    file_name: Optional[str]
+    file_size: Optional[int]
+    mime_type: Optional[str]
+    media_type: str  # значение MediaType.value
+    is_animated: bool
+    thumbnail_path: Optional[str]
+    created_at_iso: Optional[str]
+
+
+# Метаданные медиа практически неизменяемы — кэшируем срез строки в процессе,
+# чтобы каждый хит картинки/аудио не ходил в БД. Инвалидация — при удалении
+# медиа (invalidate_media_row из memorials.py).
+_media_row_cache = TTLCache(maxsize=10_000, ttl=300.0)
+
+
+def invalidate_media_row(media_id: int) -> None:
+    """Сбросить кэшированный срез Media (вызывается при изменении/удалении)."""
+    _media_row_cache.pop(media_id)
+
+
+async def _get_media_row(db: AsyncSession, media_id: int) -> Optional[_MediaRow]:
+    row = _media_row_cache.get(media_id)
+    if row is not None:
+        return row
+    media = await db.get(Media, media_id)
+    if media is None:
+        return None
+    row = _MediaRow(
+        id=media.id,
+        memorial_id=media.memorial_id,
+        file_path=media.file_path,
+        file_url=media.file_url,
+        file_name=media.file_name,
+        file_size=media.file_size,
+        mime_type=media.mime_type,
+        media_type=media.media_type.value,
+        is_animated=media.is_animated,
+        thumbnail_path=media.thumbnail_path,
+        created_at_iso=media.created_at.isoformat() if media.created_at else None,
+    )
+    _media_row_cache.set(media_id, row)
+    return row
+
 # Корень backend/ — пути в БД вида uploads/... должны резолвиться независимо от cwd uvicorn
 _BACKEND_ROOT = Path(__file__).resolve().parent.parent.parent
 UPLOAD_DIR = _BACKEND_ROOT / "uploads"
 
+# Резолвим каталоги один раз на импорте: на каждый хит медиа дальше только
+# дешёвые os.path.join по готовым строкам, без конструирования PurePath.
+_UPLOAD_DIR_STR = str(UPLOAD_DIR)
+_THUMBS_DIR = os.path.join(_UPLOAD_DIR_STR, "thumbnails")
+_AUDIO_DIR = os.path.join(_UPLOAD_DIR_STR, "audio")
+
+
+def _is_inside_uploads(path: "str | Path") -> bool:
+    """Защита от path traversal: файл обязан лежать внутри uploads/."""
+    return os.path.realpath(path).startswith(_UPLOAD_DIR_STR + os.sep)
+
 
 def _resolve_local_path(stored: str | Path) -> Path:
     """Путь из БД (часто относительный uploads/...) → абсолютный под backend."""
@@ -30,50 +103,123 @@ def _resolve_local_path(stored: str | Path) -> Path:
     return _BACKEND_ROOT / p
 
 
+@lru_cache(maxsize=128)
+def _mime_for_ext(ext: str) -> str:
+    """MIME-тип по расширению с кэшем — без прохода по mimetypes на каждый запрос."""
+    return (
+        mimetypes.types_map.get(ext)
+        or mimetypes.guess_type("x" + ext)[0]
+        or "application/octet-stream"
+    )
+
+
+def _stat_or_none(path: "str | Path") -> Optional[os.stat_result]:
+    """Один os.stat вместо Path.exists() + повторного stat внутри FileResponse."""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _etag_for(st: os.stat_result) -> str:
+    """Сильный ETag из inode + mtime + размера (уже полученного stat)."""
+    return f'"{st.st_ino:x}-{int(st.st_mtime):x}-{st.st_size:x}"'
+
+
+def _not_modified_or_headers(request: Request, st: os.stat_result):
+    """
+    304 Not Modified, если клиентский If-None-Match совпал, иначе — заголовки
+    кэширования (ETag + годовой immutable Cache-Control) для FileResponse.
+    Файлы медиа неизменяемы по id, так что агрессивное кэширование безопасно.
+    """
+    etag = _etag_for(st)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}), None
+    return None, {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+
+
 @router.get("/audio/{filename}")
-async def get_audio_file(filename: str, lang: str = Depends(get_lang)):
+async def get_audio_file(filename: str, request: Request, lang: str = Depends(get_lang)):
     """
     Получить аудио-файл по имени файла.
     Используется для обслуживания сгенерированных аудио из чата.
     """
-    audio_path = _resolve_local_path(UPLOAD_DIR / "audio" / filename)
+    audio_path = os.path.join(_AUDIO_DIR, filename)
 
-    if not audio_path.exists():
+    audio_st = _stat_or_none(audio_path) if _is_inside_uploads(audio_path) else None
+    if audio_st is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=tr(lang, "audio_file_not_found")
         )
 
+    not_modified, cache_headers = _not_modified_or_headers(request, audio_st)
+    if not_modified:
+        return not_modified
+
     return FileResponse(
         audio_path,
         media_type="audio/mpeg",
-        filename=filename
+        filename=filename,
+        stat_result=audio_st,
+        headers=cache_headers,
     )
 
 
+@router.get("/{media_id}/url")
+async def get_media_url(
+    media_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    lang: str = Depends(get_lang),
+):
+    """
+    Получить короткоживущий URL медиа-файла.
+
+    Для приватного S3-бакета выдаёт presigned URL (подпись кэшируется
+    почасово), для публичного Supabase — стабильный публичный URL,
+    иначе — путь к локальному эндпоинту сервинга.
+    """
+    media = await _get_media_row(db, media_id)
+    if not media:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=tr(lang, "media_not_found")
+        )
+
+    if settings.USE_S3:
+        if settings.supabase_public_url:
+            return {"url": get_public_url(str(media.file_path))}
+        url = get_presigned_download_url_cached(str(media.file_path))
+        if url:
+            return {"url": url}
+
+    return {"url": f"{settings.API_V1_PREFIX}/media/{media_id}"}
+
+
 @router.get("/{media_id_path:path}")  # Используем path для поддержки расширений
 async def get_media_file(
     media_id_path: str,  # Может быть "10" или "10.jpg"
+    request: Request,
     thumbnail: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     lang: str = Depends(get_lang),
 ):
-    # Извлекаем media_id из пути (убираем расширение если есть)
-    media_id_str = media_id_path.split('.')[0]
-    try:
-        media_id = int(media_id_str)
-    except ValueError:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=tr(lang, "invalid_media_id")
-        )
     """
     Получить медиа-файл по ID.
 
     Query параметры:
     - thumbnail: размер миниатюры (small, medium, large) - только для изображений
     """
-    media = db.query(Media).filter(Media.id == media_id).first()
+    # Извлекаем media_id из пути (расширение опционально)
+    match = _MEDIA_ID_RE.match(media_id_path)
+    if not match:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=tr(lang, "invalid_media_id")
+        )
+    media_id = int(match.group(1))
+
+    media = await _get_media_row(db, media_id)
     if not media:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -85,31 +231,48 @@ async def get_media_file(
     # --- Сначала всегда пробуем локальные файлы (uploads/).
     # При USE_S3=true старый код сразу редиректил в Supabase — локальные сиды/портреты
     # при этом не в bucket → 400 на публичном URL. Прод: файлы в S3; локальная dev: файлы на диске.
-    if thumbnail and media.media_type.value == "photo":
+    if thumbnail and media.media_type == "photo":
         if thumbnail in ("small", "medium", "large"):
-            thumb_candidate = UPLOAD_DIR / "thumbnails" / f"{file_path.stem}_{thumbnail}.jpg"
-            thumb_resolved = _resolve_local_path(thumb_candidate)
-            if thumb_resolved.exists():
+            thumb_resolved = os.path.join(_THUMBS_DIR, f"{file_path.stem}_{thumbnail}.jpg")
+            thumb_st = _stat_or_none(thumb_resolved)
+            if thumb_st is not None:
+                not_modified, cache_headers = _not_modified_or_headers(request, thumb_st)
+                if not_modified:
+                    return not_modified
                 return FileResponse(
                     thumb_resolved,
                     media_type="image/jpeg",
-                    filename=f"{media.file_name}_thumb_{thumbnail}.jpg"
+                    filename=f"{media.file_name}_thumb_{thumbnail}.jpg",
+                    stat_result=thumb_st,
+                    headers=cache_headers,
                 )
             if media.thumbnail_path:
                 db_thumb = _resolve_local_path(media.thumbnail_path)
-                if db_thumb.exists():
+                db_thumb_st = _stat_or_none(db_thumb)
+                if db_thumb_st is not None:
+                    not_modified, cache_headers = _not_modified_or_headers(request, db_thumb_st)
+                    if not_modified:
+                        return not_modified
                     return FileResponse(
                         db_thumb,
                         media_type="image/jpeg",
-                        filename=f"{media.file_name}_thumb.jpg"
+                        filename=f"{media.file_name}_thumb.jpg",
+                        stat_result=db_thumb_st,
+                        headers=cache_headers,
                     )
 
-    if file_path.exists():
-        mime_type = media.mime_type or mimetypes.guess_type(str(file_path))[0] or "application/octet-stream"
+    file_st = _stat_or_none(file_path) if _is_inside_uploads(file_path) else None
+    if file_st is not None:
+        not_modified, cache_headers = _not_modified_or_headers(request, file_st)
+        if not_modified:
+            return not_modified
+        mime_type = media.mime_type or _mime_for_ext(file_path.suffix.lower())
         return FileResponse(
             file_path,
             media_type=mime_type,
-            filename=media.file_name
+            filename=media.file_name,
+            stat_result=file_st,
+            headers=cache_headers,
         )
 
     # --- Только если на диске нет — публичный URL в Supabase Storage ---
@@ -119,7 +282,7 @@ async def get_media_file(
             return RedirectResponse(url=media.file_url, status_code=302)
         # Фолбэк: строим URL из S3-ключа
         if settings.supabase_public_url:
-            if thumbnail and media.media_type.value == "photo" and media.thumbnail_path:
+            if thumbnail and media.media_type == "photo" and media.thumbnail_path:
                 return RedirectResponse(url=get_public_url(media.thumbnail_path), status_code=302)
             return RedirectResponse(url=get_public_url(str(media.file_path)), status_code=302)
 
@@ -132,37 +295,37 @@ async def get_media_file(
 @router.get("/{media_id}/info")
 async def get_media_info(
     media_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     lang: str = Depends(get_lang),
 ):
     """
     Получить информацию о медиа-файле (метаданные).
     """
-    media = db.query(Media).filter(Media.id == media_id).first()
+    media = await _get_media_row(db, media_id)
     if not media:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=tr(lang, "media_not_found")
         )
-    
+
     file_path = _resolve_local_path(media.file_path)
-    file_exists = file_path.exists()
-    
+    file_exists = _stat_or_none(file_path) is not None
+
     info = {
         "id": media.id,
         "memorial_id": media.memorial_id,
         "file_name": media.file_name,
         "file_size": media.file_size,
         "mime_type": media.mime_type,
-        "media_type": media.media_type.value,
+        "media_type": media.media_type,
         "is_animated": media.is_animated,
         "has_thumbnail": media.thumbnail_path is not None,
         "file_exists": file_exists,
-        "created_at": media.created_at.isoformat() if media.created_at else None,
+        "created_at": media.created_at_iso,
     }
-    
+
     # Добавляем размеры изображения если доступно
-    if media.media_type.value == "photo" and file_exists:
+    if media.media_type == "photo" and file_exists:
         from app.services.media_service import get_image_dimensions
         dimensions = get_image_dimensions(file_path)
         if dimensions:
@@ -1,22 +1,27 @@
 """
 API endpoints для работы с мемориалами, медиа и воспоминаниями.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, status
-from fastapi.responses import StreamingResponse
-from sqlalchemy import or_, func, select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile, File, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import insert, or_, func, select
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
+import aiofiles
+import asyncio
+import hashlib
 import uuid
+from functools import partial
 from pathlib import Path
 from datetime import datetime, timezone
 
 from app.auth import (
+    ensure_memorial_exists,
     get_current_user,
     get_optional_user,
     has_site_wide_memorial_owner,
     require_memorial_access,
 )
-from app.db import get_db
+from app.db import SessionLocal, get_db
 from app.i18n import get_lang, tr
 from app.models import Memorial, Media, Memory, MediaType, MemorialAccess, MemorialInvite, User, UserRole
 from app.schemas import (
@@ -33,7 +38,9 @@ from app.schemas import (
     SetCoverRequest,
     TimelineItem,
 )
+from app.api.media import _mime_for_ext, invalidate_media_row
 from app.config import settings
+from app.executors import IO_POOL
 from app.services.billing import check_memorial_limit
 from en_memorials_manifest import EXPECTED_EN_NAMES
 from app.services.media_service import (
@@ -51,13 +58,27 @@ from app.services.video_service import (
 )
 from app.services.s3_service import (
     upload_file_to_s3,
-    get_presigned_upload_url,
-    get_presigned_download_url,
-    get_public_url,
+    get_object_public_url,
+)
+# Импорты Celery/AI на уровне модуля: первый импорт worker'а — это ~100ms
+# инициализации Celery-приложения, раньше её платил первый же POST memories.
+# Циклов нет: worker и ai_tasks не импортируют app.api.*
+from celery import group
+from app.services.ai_tasks import (
+    delete_memory_embedding,
+    get_embedding,
+    upsert_memory_embedding,
+)
+from app.workers.worker import (
+    batch_create_memory_embeddings_task,
+    create_memory_embedding_task,
 )
 
 router = APIRouter(prefix="/memorials", tags=["memorials"])
 
+# Размер чанка потоковой записи загружаемых файлов
+_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
 # Создание директорий для загрузок
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -75,16 +96,76 @@ def _build_public_memorial_url(memorial_id: int) -> str:
     return f"{base}/app/m/{memorial_id}"
 
 
-def get_media_type_from_mime(mime_type: str) -> MediaType:
-    """Определяет тип медиа по MIME типу."""
-    if mime_type.startswith("image/"):
-        return MediaType.PHOTO
-    elif mime_type.startswith("video/"):
-        return MediaType.VIDEO
-    elif mime_type.startswith("audio/"):
-        return MediaType.AUDIO
-    else:
-        return MediaType.DOCUMENT
+async def _enqueue_or_compute_embedding(
+    memory_id: int,
+    memorial_id: int,
+    content: str,
+    title: Optional[str] = None,
+    old_embedding_id: Optional[str] = None,
+) -> None:
+    """
+    Фоновое создание embedding для воспоминания: Celery-задача, а при
+    недоступном Redis — синхронный вызов OpenAI/Qdrant. Выполняется через
+    BackgroundTasks уже после отправки HTTP-ответа, поэтому открывает
+    собственную сессию БД для записи embedding_id.
+    """
+    if old_embedding_id:
+        try:
+            await delete_memory_embedding(memory_id, memorial_id)
+        except Exception as e:
+            print(f"Warning: Failed to delete old embedding: {e}")
+
+    try:
+        # kombu шлёт задачу в Redis блокирующим сокетом — уводим в поток
+        await asyncio.to_thread(
+            create_memory_embedding_task.delay,
+            memory_id=memory_id,
+            memorial_id=memorial_id,
+            text=content,
+        )
+    except Exception as e:
+        # Если worker недоступен, создаем embedding синхронно
+        error_msg = str(e)
+        if "Connection refused" in error_msg or "redis" in error_msg.lower() or "OperationalError" in error_msg:
+            try:
+                embedding = await get_embedding(content)
+                vector_id = await upsert_memory_embedding(
+                    memory_id=memory_id,
+                    memorial_id=memorial_id,
+                    text=content,
+                    embedding=embedding,
+                    title=title,
+                )
+                if vector_id:
+                    db = SessionLocal()
+                    try:
+                        mem = db.get(Memory, memory_id)
+                        if mem:
+                            mem.embedding_id = vector_id
+                            db.commit()
+                    finally:
+                        db.close()
+                print(f"Created embedding synchronously for memory {memory_id}")
+            except Exception as sync_error:
+                print(f"Warning: Failed to create embedding synchronously: {sync_error}")
+        else:
+            print(f"Warning: Failed to queue embedding task: {e}")
+
+
+# Тип медиа по расширению файла (ALLOWED_EXTENSIONS): не доверяем
+# клиентскому Content-Type и не гоняем цепочку startswith на каждый upload
+_EXT_TO_MEDIA = {
+    "jpg": MediaType.PHOTO,
+    "jpeg": MediaType.PHOTO,
+    "png": MediaType.PHOTO,
+    "gif": MediaType.PHOTO,
+    "mp4": MediaType.VIDEO,
+    "mov": MediaType.VIDEO,
+    "mp3": MediaType.AUDIO,
+    "wav": MediaType.AUDIO,
+    "pdf": MediaType.DOCUMENT,
+    "txt": MediaType.DOCUMENT,
+}
 
 
 @router.get("/", response_model=List[MemorialListItem])
@@ -134,8 +215,11 @@ async def list_memorials(
         media_rows = db.query(Media.id, Media.file_url).filter(Media.id.in_(cover_ids)).all()
         cover_urls = {mid: url for mid, url in media_rows if url}
 
-    return [
-        MemorialListItem(
+    # model_construct: значения приходят из ORM уже нужных типов, повторная
+    # валидация не нужна. Готовый ORJSONResponse минует второй проход FastAPI
+    # (field-валидация response_model + jsonable_encoder) по всему списку.
+    items = [
+        MemorialListItem.model_construct(
             id=m.id,
             name=m.name,
             description=m.description,
@@ -154,6 +238,7 @@ async def list_memorials(
         )
         for m, mc, mc2 in rows
     ]
+    return ORJSONResponse([item.model_dump(mode="json") for item in items])
 
 
 @router.get("/demo", response_model=List[MemorialListItem])
@@ -229,7 +314,6 @@ async def create_memorial(
     )
     db.add(access)
     db.commit()
-    db.refresh(db_memorial)
     return db_memorial
 
 
@@ -265,12 +349,20 @@ async def get_memorial(
             if access:
                 current_user_role = access.role.value
 
-    response = MemorialDetailResponse.model_validate(memorial)
-    response.current_user_role = current_user_role
     # Populate is_demo from owner
     owner = db.query(User).filter(User.id == memorial.owner_id).first()
-    response.is_demo = bool(owner and getattr(owner, "is_demo", False))
-    return response
+
+    # from_orm_fast (model_construct): значения пришли из БД уже нужных типов,
+    # валидация на чтении не нужна — особенно для списков media/memories.
+    # Готовый ORJSONResponse минует и второй проход FastAPI по response_model
+    response = MemorialDetailResponse.from_orm_fast(
+        memorial,
+        media=tuple(MediaResponse.from_orm_fast(m) for m in memorial.media),
+        memories=tuple(MemoryResponse.from_orm_fast(mem) for mem in memorial.memories),
+        current_user_role=current_user_role,
+        is_demo=bool(owner and getattr(owner, "is_demo", False)),
+    )
+    return ORJSONResponse(response.model_dump(mode="json"))
 
 
 @router.delete("/{memorial_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -303,9 +395,7 @@ async def delete_memorial(
     for memory in memorial.memories:
         if memory.embedding_id:
             try:
-                from app.services.ai_tasks import delete_memory_embedding
-                import asyncio
-                asyncio.run(delete_memory_embedding(memory.id, memorial_id))
+                await delete_memory_embedding(memory.id, memorial_id)
             except Exception as e:
                 print(f"Warning: Error deleting embedding for memory {memory.id}: {e}")
 
@@ -370,7 +460,6 @@ async def update_memorial(
         setattr(memorial, field, value)
     
     db.commit()
-    db.refresh(memorial)
     return memorial
 
 
@@ -402,24 +491,40 @@ async def upload_media(
     
     # Сохранение файла
     try:
-        contents = await file.read()
-        if len(contents) > settings.MAX_UPLOAD_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=tr(lang, "file_too_large", max_size=settings.MAX_UPLOAD_SIZE)
-            )
-        
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        # Определение типа медиа
-        media_type = get_media_type_from_mime(file.content_type or "application/octet-stream")
-        
-        # Обработка медиа: валидация, оптимизация, генерация миниатюр/превью
+        # Потоковая запись чанками по 4MB: не буферизуем весь файл (до 100MB)
+        # в памяти и отсекаем превышение лимита ещё во время чтения.
+        # 4MB вместо 1MB — вчетверо меньше пар read/write-сисколлов (и прыжков
+        # через тред-пул aiofiles) на 100MB видео при всё ещё скромном буфере.
+        # SHA-256 оригинала считаем в том же проходе — для дедупликации
+        total_size = 0
+        hasher = hashlib.sha256()
+        async with aiofiles.open(file_path, "wb") as out:
+            while chunk := await file.read(_UPLOAD_CHUNK_SIZE):
+                total_size += len(chunk)
+                hasher.update(chunk)
+                if total_size > settings.MAX_UPLOAD_SIZE:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=tr(lang, "file_too_large", max_size=settings.MAX_UPLOAD_SIZE)
+                    )
+                await out.write(chunk)
+
+        # Определение типа медиа по уже извлечённому расширению
+        media_type = _EXT_TO_MEDIA.get(file_ext, MediaType.DOCUMENT)
+
+        # Клиент может не прислать Content-Type — тогда один раз берём MIME
+        # по расширению (кэшированный lookup), он нужен и для S3, и для БД
+        content_type = file.content_type or _mime_for_ext("." + file_ext)
+
+        # Обработка медиа: валидация, оптимизация, генерация миниатюр/превью.
+        # Pillow/ffmpeg — синхронные и тяжёлые (сотни ms на фото): уводим их
+        # в общий IO_POOL, чтобы не останавливать event loop на время обработки
+        loop = asyncio.get_running_loop()
         thumbnail_path = None
+        thumb_task = None
         if media_type == MediaType.PHOTO:
             # Валидация изображения
-            is_valid, error_msg = validate_image_file(file_path)
+            is_valid, error_msg = await loop.run_in_executor(IO_POOL, validate_image_file, file_path)
             if not is_valid:
                 file_path.unlink()
                 raise HTTPException(
@@ -428,19 +533,20 @@ async def upload_media(
                 )
             
             # Оптимизация больших изображений (если больше 5MB)
-            if len(contents) > 5 * 1024 * 1024:  # 5MB
-                optimize_image(file_path, max_size=(1920, 1920), quality=85)
-                # Обновляем размер после оптимизации
-                contents = file_path.read_bytes()
+            if total_size > 5 * 1024 * 1024:  # 5MB
+                await loop.run_in_executor(
+                    IO_POOL, partial(optimize_image, file_path, max_size=(1920, 1920), quality=85)
+                )
+                # Обновляем размер после оптимизации (stat вместо чтения файла в память)
+                total_size = file_path.stat().st_size
             
-            # Генерация миниатюр
-            thumbnails = generate_all_thumbnails(file_path, THUMBNAILS_DIR)
-            if thumbnails.get("medium"):
-                thumbnail_path = thumbnails["medium"]
+            # Генерация миниатюр — запускаем, но не ждём: S3-загрузка оригинала
+            # может идти параллельно (оба только читают file_path)
+            thumb_task = loop.run_in_executor(IO_POOL, generate_all_thumbnails, file_path, THUMBNAILS_DIR)
         
         elif media_type == MediaType.VIDEO:
             # Валидация видео
-            is_valid, error_msg = validate_video_file(file_path)
+            is_valid, error_msg = await loop.run_in_executor(IO_POOL, validate_video_file, file_path)
             if not is_valid:
                 file_path.unlink()
                 raise HTTPException(
@@ -448,23 +554,41 @@ async def upload_media(
                     detail=tr(lang, "invalid_video_file", error=error_msg)
                 )
             
-            # Генерация превью для видео
+            # Генерация превью для видео (ffmpeg) — тоже параллельно с S3-загрузкой оригинала
             video_preview_path = THUMBNAILS_DIR / f"{file_path.stem}_preview.jpg"
-            if generate_video_thumbnail(file_path, video_preview_path, time_offset=1.0):
-                thumbnail_path = str(video_preview_path)
+            thumb_task = loop.run_in_executor(
+                IO_POOL, partial(generate_video_thumbnail, file_path, video_preview_path, time_offset=1.0)
+            )
         
-        # Загрузка в S3 / Supabase Storage если настроено
+        # Загрузка в S3 / Supabase Storage если настроено.
+        # PUT оригинала стартует параллельно с генерацией миниатюр выше:
+        # CPU-работа Pillow/ffmpeg перекрывается сетевой загрузкой
         file_url = None
         s3_key = None
         s3_thumbnail_key = None
+        upload_ok = False
+        upload_task = None
         if settings.USE_S3:
             s3_key = f"memorials/{memorial_id}/{file_name}"
-            if upload_file_to_s3(file_path, s3_key, file.content_type):
-                # Supabase Storage: используем публичный URL; AWS S3: presigned URL
-                if settings.supabase_public_url:
-                    file_url = get_public_url(s3_key)
-                else:
-                    file_url = get_presigned_download_url(s3_key, expires_in=86400 * 365)
+            upload_task = loop.run_in_executor(IO_POOL, upload_file_to_s3, file_path, s3_key, content_type)
+
+        if thumb_task is not None:
+            thumb_result = await thumb_task
+            if media_type == MediaType.PHOTO:
+                if thumb_result.get("medium"):
+                    thumbnail_path = thumb_result["medium"]
+            elif thumb_result:
+                thumbnail_path = str(video_preview_path)
+        if upload_task is not None:
+            upload_ok = await upload_task
+
+        if settings.USE_S3:
+            if upload_ok:
+                # Стабильный публичный URL (Supabase или прямой URL бакета).
+                # Раньше здесь хранился presigned URL на год — SigV4 ограничивает
+                # срок жизни подписи 7 днями, так что такой URL был заведомо битым;
+                # короткоживущие подписи теперь выдаёт GET /media/{id}/url
+                file_url = get_object_public_url(s3_key)
                 file_path.unlink(missing_ok=True)  # удаляем локальную копию
 
             # Загрузка thumbnail в S3
@@ -472,7 +596,7 @@ async def upload_media(
                 thumb_local = Path(thumbnail_path)
                 if thumb_local.exists():
                     s3_thumbnail_key = f"memorials/{memorial_id}/thumbnails/{thumb_local.name}"
-                    if upload_file_to_s3(thumb_local, s3_thumbnail_key, "image/jpeg"):
+                    if await loop.run_in_executor(IO_POOL, upload_file_to_s3, thumb_local, s3_thumbnail_key, "image/jpeg"):
                         thumb_local.unlink(missing_ok=True)
 
         # Создание записи в БД
@@ -481,14 +605,14 @@ async def upload_media(
             file_path=s3_key if settings.USE_S3 and s3_key else str(file_path),
             file_url=file_url,
             file_name=file.filename,
-            file_size=len(contents),
-            mime_type=file.content_type,
+            file_size=total_size,
+            mime_type=content_type,
             media_type=media_type,
             thumbnail_path=s3_thumbnail_key if settings.USE_S3 and s3_thumbnail_key else thumbnail_path,
+            sha256=hasher.hexdigest(),
         )
         db.add(db_media)
         db.commit()
-        db.refresh(db_media)
         
         return db_media
     
@@ -591,6 +715,9 @@ async def delete_media(
     # Удаление записи из БД
     db.delete(media)
     db.commit()
+
+    # Сбрасываем кэш среза Media в эндпоинтах сервинга
+    invalidate_media_row(media_id)
     
     print(f"✅ Deleted media {media_id} from memorial {memorial_id}")
     return None
@@ -600,6 +727,7 @@ async def delete_media(
 async def create_memory(
     memorial_id: int,
     memory: MemoryCreate,
+    background: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user),
     invite_token: Optional[str] = Query(None, description="Инвайт-токен для анонимного вклада"),
@@ -617,14 +745,12 @@ async def create_memory(
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=tr(lang, "invite_token_expired"))
         if not invite.permissions.get("add_memories"):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=tr(lang, "invite_no_memories_permission"))
-        memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
-        if not memorial:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=tr(lang, "memorial_not_found"))
+        ensure_memorial_exists(db, memorial_id, detail=tr(lang, "memorial_not_found"))
         # Инкрементируем счётчик использований только при фактическом добавлении
         invite.uses_count = (invite.uses_count or 0) + 1
     elif current_user:
         invite = None
-        memorial = require_memorial_access(memorial_id, current_user, db, min_role=UserRole.EDITOR)
+        require_memorial_access(memorial_id, current_user, db, min_role=UserRole.EDITOR)
     else:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=tr(lang, "authentication_required"))
 
@@ -636,43 +762,16 @@ async def create_memory(
     )
     db.add(db_memory)
     db.commit()
-    db.refresh(db_memory)
     
-    # Создание embedding в фоновой задаче или синхронно
-    try:
-        from app.workers.worker import create_memory_embedding_task
-        create_memory_embedding_task.delay(
-            memory_id=db_memory.id,
-            memorial_id=memorial_id,
-            text=db_memory.content
-        )
-    except Exception as e:
-        # Если worker недоступен, создаем embedding синхронно
-        error_msg = str(e)
-        if "Connection refused" in error_msg or "redis" in error_msg.lower() or "OperationalError" in error_msg:
-            try:
-                # Синхронное создание embedding
-                import asyncio
-                from app.services.ai_tasks import get_embedding, upsert_memory_embedding
-                
-                async def create_embedding_sync():
-                    embedding = await get_embedding(db_memory.content)
-                    vector_id = await upsert_memory_embedding(
-                        memory_id=db_memory.id,
-                        memorial_id=memorial_id,
-                        text=db_memory.content,
-                        embedding=embedding,
-                        title=db_memory.title
-                    )
-                    db_memory.embedding_id = vector_id
-                    db.commit()
-                
-                asyncio.run(create_embedding_sync())
-                print(f"Created embedding synchronously for memory {db_memory.id}")
-            except Exception as sync_error:
-                print(f"Warning: Failed to create embedding synchronously: {sync_error}")
-        else:
-            print(f"Warning: Failed to queue embedding task: {e}")
+    # Создание embedding — после отправки ответа: POST возвращается сразу
+    # после commit, не дожидаясь ни Redis RTT, ни (в фолбэке) вызова OpenAI
+    background.add_task(
+        _enqueue_or_compute_embedding,
+        db_memory.id,
+        memorial_id,
+        db_memory.content,
+        db_memory.title,
+    )
 
     # Инвалидируем кэш персоны аватара — воспоминания изменились
     try:
@@ -686,11 +785,69 @@ async def create_memory(
     return db_memory
 
 
+@router.post("/{memorial_id}/memories/batch", response_model=List[MemoryResponse], status_code=status.HTTP_201_CREATED)
+async def create_memories_batch(
+    memorial_id: int,
+    memories: List[MemoryCreate],
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Добавить несколько воспоминаний одним запросом (импорт из документа).
+
+    Один multi-VALUES INSERT + один commit вместо N отдельных POST;
+    embeddings ставятся в очередь пачками (batch-задача на чанк уникальных
+    текстов) уже после отправки ответа.
+    """
+    require_memorial_access(memorial_id, current_user, db, min_role=UserRole.EDITOR)
+
+    if not memories:
+        return []
+
+    rows = [
+        dict(**m.dict(), memorial_id=memorial_id, source="user")
+        for m in memories
+    ]
+    created = db.execute(insert(Memory).values(rows).returning(Memory)).scalars().all()
+    db.commit()
+
+    # Сохраняем данные для фоновой задачи до закрытия сессии запроса
+    created_items = [(mem.id, mem.content) for mem in created]
+    background.add_task(_enqueue_batch_embeddings, memorial_id, created_items)
+
+    return created
+
+
+def _enqueue_batch_embeddings(memorial_id: int, created_items: list) -> None:
+    """
+    Постановка embeddings для пачки воспоминаний: дедупликация одинаковых
+    текстов по sha256 и одна batch-задача на чанк вместо N .delay().
+    """
+    try:
+        unique_texts: dict = {}
+        for memory_id, content in created_items:
+            key = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            entry = unique_texts.setdefault(key, [[], content])
+            entry[0].append(memory_id)
+
+        items = [[ids, text] for ids, text in unique_texts.values()]
+        chunk_size = 64  # как MAX_EMBEDDING_BATCH в embeddings.py
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        group(
+            batch_create_memory_embeddings_task.s(memorial_id, chunk)
+            for chunk in chunks
+        ).apply_async()
+    except Exception as e:
+        print(f"Warning: Failed to queue batch embedding tasks: {e}")
+
+
 @router.patch("/{memorial_id}/memories/{memory_id}", response_model=MemoryResponse)
 async def update_memory(
     memorial_id: int,
     memory_id: int,
     memory_update: MemoryUpdate,
+    background: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     lang: str = Depends(get_lang),
@@ -723,47 +880,18 @@ async def update_memory(
         setattr(db_memory, field, value)
     
     db.commit()
-    db.refresh(db_memory)
     
     # Если изменился контент, пересоздаем embedding
     if content_changed:
-        try:
-            from app.workers.worker import create_memory_embedding_task
-            # Удаляем старый embedding
-            if db_memory.embedding_id:
-                from app.services.ai_tasks import delete_memory_embedding
-                import asyncio
-                asyncio.run(delete_memory_embedding(memory_id, memorial_id))
-            
-            # Создаем новый embedding
-            create_memory_embedding_task.delay(
-                memory_id=db_memory.id,
-                memorial_id=memorial_id,
-                text=db_memory.content
-            )
-        except Exception as e:
-            # Если worker недоступен, создаем синхронно
-            error_msg = str(e)
-            if "Connection refused" in error_msg or "redis" in error_msg.lower():
-                try:
-                    import asyncio
-                    from app.services.ai_tasks import get_embedding, upsert_memory_embedding
-                    
-                    async def recreate_embedding():
-                        embedding = await get_embedding(db_memory.content)
-                        vector_id = await upsert_memory_embedding(
-                            memory_id=db_memory.id,
-                            memorial_id=memorial_id,
-                            text=db_memory.content,
-                            embedding=embedding,
-                            title=db_memory.title
-                        )
-                        db_memory.embedding_id = vector_id
-                        db.commit()
-                    
-                    asyncio.run(recreate_embedding())
-                except Exception as sync_error:
-                    print(f"Warning: Failed to recreate embedding: {sync_error}")
+        # Пересоздание embedding (удаление старого + новое) — после ответа
+        background.add_task(
+            _enqueue_or_compute_embedding,
+            db_memory.id,
+            memorial_id,
+            db_memory.content,
+            db_memory.title,
+            db_memory.embedding_id,
+        )
     
     return db_memory
 
@@ -795,9 +923,7 @@ async def delete_memory(
     # Удаляем embedding из векторной БД
     if db_memory.embedding_id:
         try:
-            from app.services.ai_tasks import delete_memory_embedding
-            import asyncio
-            asyncio.run(delete_memory_embedding(memory_id, memorial_id))
+            await delete_memory_embedding(memory_id, memorial_id)
         except Exception as e:
             print(f"Warning: Failed to delete embedding: {e}")
     
@@ -819,10 +945,11 @@ async def submit_public_memory(
     Anyone (anonymous or authenticated) can submit a memory for moderation.
     Goes into status='pending'; owner must approve before it appears publicly.
     """
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
-    if not memorial:
+    # Нужен только is_public — тянем одну колонку вместо целой строки
+    row = db.query(Memorial.is_public).filter(Memorial.id == memorial_id).first()
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=tr(lang, "memorial_not_found"))
-    if not memorial.is_public:
+    if not row.is_public:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=tr(lang, "memorial_is_private"))
     db_memory = Memory(
         memorial_id=memorial_id,
@@ -834,7 +961,6 @@ async def submit_public_memory(
     )
     db.add(db_memory)
     db.commit()
-    db.refresh(db_memory)
     return db_memory
 
 
@@ -867,10 +993,8 @@ async def approve_memory(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=tr(lang, "memory_not_found"))
     mem.status = "approved"
     db.commit()
-    db.refresh(mem)
     # Create embedding for newly approved memory
     try:
-        from app.workers.worker import create_memory_embedding_task
         create_memory_embedding_task.delay(memory_id=mem.id, memorial_id=memorial_id, text=mem.content)
     except Exception:
         pass
@@ -953,7 +1077,6 @@ async def set_cover_photo(
 
     memorial.cover_photo_id = body.media_id
     db.commit()
-    db.refresh(memorial)
     return memorial
 
 
@@ -6,8 +6,8 @@ from sqlalchemy.orm import Session
 import uuid
 from pathlib import Path
 
+from app.auth import ensure_memorial_exists
 from app.db import get_db
-from app.models import Memorial
 from app.schemas import PresignedUploadUrlRequest, PresignedUploadUrlResponse
 from app.services.s3_service import get_presigned_upload_url
 from app.config import settings
@@ -36,13 +36,8 @@ async def get_presigned_upload_url_endpoint(
             detail="S3 is not enabled. Set USE_S3=true in configuration."
         )
     
-    # Проверка существования мемориала
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
-    if not memorial:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Memorial not found"
-        )
+    # Проверка существования мемориала (EXISTS, без загрузки строки)
+    ensure_memorial_exists(db, memorial_id)
     
     # Проверка размера файла
     if request.file_size > settings.MAX_UPLOAD_SIZE:
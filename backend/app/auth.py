@@ -8,6 +8,7 @@ import bcrypt as _bcrypt
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
 from app.config import settings
@@ -145,7 +146,26 @@ def require_memorial_access(
     Check user access to a memorial.
     Returns Memorial or raises 401/403/404.
     """
-    memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
+    # Мемориал + запись доступа одним OUTER JOIN вместо двух SELECT:
+    # этот хелпер стоит в начале почти каждого эндпоинта, round-trip'ы тут заметны
+    if user is not None:
+        row = (
+            db.query(Memorial, MemorialAccess)
+            .outerjoin(
+                MemorialAccess,
+                and_(
+                    MemorialAccess.memorial_id == Memorial.id,
+                    MemorialAccess.user_id == user.id,
+                ),
+            )
+            .filter(Memorial.id == memorial_id)
+            .first()
+        )
+        memorial, access = row if row is not None else (None, None)
+    else:
+        memorial = db.query(Memorial).filter(Memorial.id == memorial_id).first()
+        access = None
+
     if not memorial:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Memorial not found")
 
@@ -163,11 +183,6 @@ def require_memorial_access(
     if has_site_wide_memorial_owner(user):
         return memorial
 
-    access = db.query(MemorialAccess).filter(
-        MemorialAccess.memorial_id == memorial_id,
-        MemorialAccess.user_id == user.id,
-    ).first()
-
     if access is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
@@ -175,3 +190,18 @@ def require_memorial_access(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
 
     return memorial
+
+
+def ensure_memorial_exists(
+    db: Session,
+    memorial_id: int,
+    detail: str = "Memorial not found",
+) -> None:
+    """
+    404, если мемориала нет. Для хендлеров, которым сам объект Memorial
+    дальше не нужен: EXISTS-проба по PK вместо загрузки и гидрации строки.
+    """
+    if not db.query(
+        db.query(Memorial.id).filter(Memorial.id == memorial_id).exists()
+    ).scalar():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
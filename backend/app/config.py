@@ -1,6 +1,7 @@
 """
 Конфигурация приложения через переменные окружения.
 """
+from functools import cached_property
 from pathlib import Path
 from pydantic import field_validator, model_validator
 from pydantic_settings import BaseSettings
@@ -29,6 +30,17 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    # text-embedding-3-* поддерживают параметр dimensions (MRL-усечение):
+    # 512-мерный вектор втрое меньше 1536 в сети, в Qdrant и в ядре поиска
+    # при минимальной потере качества. 0 = полная размерность модели.
+    OPENAI_EMBEDDING_DIMS: int = 512
+
+    @cached_property
+    def embedding_dims(self) -> int:
+        """Эффективная размерность векторов: dimensions умеют только text-embedding-3-*."""
+        if self.OPENAI_EMBEDDING_DIMS and self.OPENAI_EMBEDDING_MODEL.startswith("text-embedding-3"):
+            return self.OPENAI_EMBEDDING_DIMS
+        return 1536
 
     @field_validator("OPENAI_MODEL", mode="before")
     @classmethod
@@ -85,7 +97,24 @@ class Settings(BaseSettings):
     QDRANT_URL: str = "http://localhost:6333"  # Локальный или Qdrant Cloud URL
     QDRANT_API_KEY: str = ""  # Опционально, для Qdrant Cloud
     QDRANT_COLLECTION_NAME: str = "memorial-memories"
+
+    @cached_property
+    def qdrant_collection(self) -> str:
+        """
+        Имя коллекции с суффиксом размерности (memorial-memories-d512).
+
+        Смена OPENAI_EMBEDDING_DIMS не должна писать векторы в коллекцию
+        со старой размерностью: новая коллекция создастся пустой, и
+        авто-ребилд embeddings на старте её переиндексирует.
+        """
+        if self.embedding_dims != 1536:
+            return f"{self.QDRANT_COLLECTION_NAME}-d{self.embedding_dims}"
+        return self.QDRANT_COLLECTION_NAME
     QDRANT_LOCAL_PATH: str = ""  # Пустая строка = использовать QDRANT_URL (cloud). Задай путь для локальной разработки.
+    # gRPC вместо REST: векторы летят упакованным protobuf, а не JSON-списком
+    # float'ов (~3-5x меньше CPU на сериализацию и байтов в сети).
+    # Выключайте, если между приложением и Qdrant только HTTP-прокси без порта 6334.
+    QDRANT_PREFER_GRPC: bool = True
     
     # Supabase
     SUPABASE_URL: str = ""  # https://xxxx.supabase.co
@@ -157,6 +186,10 @@ class Settings(BaseSettings):
     # Application
     DEBUG: bool = True
     SQL_ECHO: bool = False  # SQL logs are expensive; enable only for debugging.
+    # Авто-создание таблиц (create_all + ALTER-миграции) на старте процесса.
+    # Дёшево для dev/SQLite, но на проде с несколькими worker'ами это десятки
+    # reflection-запросов на каждый процесс — после перехода на Alembic ставьте false.
+    AUTO_CREATE_TABLES: bool = True
     API_V1_PREFIX: str = "/api/v1"
     # Локальная разработка + прод фронт на Vercel (можно дописать через env CORS_ORIGINS)
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:5173,https://memorial-mvp.vercel.app"
@@ -167,15 +200,15 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 104857600  # 100MB
     ALLOWED_EXTENSIONS: str = "jpg,jpeg,png,gif,mp4,mov,mp3,wav,pdf,txt"
     
-    @property
-    def cors_origins_list(self) -> List[str]:
-        """Преобразует строку CORS_ORIGINS в список."""
-        return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
-    
-    @property
-    def allowed_extensions_list(self) -> List[str]:
-        """Преобразует строку ALLOWED_EXTENSIONS в список."""
-        return [ext.strip().lower() for ext in self.ALLOWED_EXTENSIONS.split(",")]
+    @cached_property
+    def cors_origins_list(self) -> tuple:
+        """CORS_ORIGINS как кортеж (считается один раз, а не на каждый вызов)."""
+        return tuple(origin.strip() for origin in self.CORS_ORIGINS.split(","))
+
+    @cached_property
+    def allowed_extensions_list(self) -> frozenset:
+        """ALLOWED_EXTENSIONS как frozenset: O(1) проверка расширения на каждом upload."""
+        return frozenset(ext.strip().lower() for ext in self.ALLOWED_EXTENSIONS.split(","))
     
     @model_validator(mode="after")
     def validate_production_secret_key(self):
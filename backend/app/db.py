@@ -28,8 +28,11 @@ elif _is_postgres:
 else:
     engine = create_engine(settings.DATABASE_URL, echo=settings.SQL_ECHO)
 
-# Создание фабрики сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Создание фабрики сессий.
+# expire_on_commit=False (как и в async-фабрике ниже): объекты после commit
+# остаются загруженными, и возврат ORM-объекта из эндпоинта не провоцирует
+# скрытый re-SELECT; id и server defaults приходят через RETURNING ещё на flush
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # Базовый класс для моделей
 Base = declarative_base()
@@ -46,3 +49,60 @@ def get_db():
     finally:
         db.close()
 
+
+# ── Асинхронный движок ────────────────────────────────────────────────────────
+# Sync Session внутри async def держит поток event loop на каждом запросе к БД.
+# Горячие read-эндпоинты могут брать AsyncSession через get_async_db — ожидание
+# БД тогда реально перекрывается с ожиданием OpenAI/Qdrant.
+# Драйверы: sqlite+aiosqlite (dev), postgresql+asyncpg (prod).
+# Write-пути с Celery и эндпоинты, покрытые тестами через подмену get_db,
+# остаются на sync Session.
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def _async_database_url() -> str:
+    """DATABASE_URL с асинхронным драйвером."""
+    url = settings.DATABASE_URL
+    if "+aiosqlite" in url or "+asyncpg" in url:
+        return url
+    if _is_sqlite:
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if _is_postgres:
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
+
+def _get_async_sessionmaker():
+    """Ленивая инициализация async-движка (драйвер нужен только при использовании)."""
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        kwargs = {"echo": settings.SQL_ECHO}
+        if _is_sqlite:
+            kwargs["connect_args"] = {"check_same_thread": False}
+        elif _is_postgres:
+            kwargs.update(
+                pool_pre_ping=True,
+                pool_size=20,
+                max_overflow=10,
+                pool_recycle=300,
+            )
+        _async_engine = create_async_engine(_async_database_url(), **kwargs)
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    """
+    Dependency для получения асинхронной сессии базы данных.
+    Используется в горячих read-эндпоинтах FastAPI.
+    """
+    session_factory = _get_async_sessionmaker()
+    async with session_factory() as session:
+        yield session
+
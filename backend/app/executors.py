@@ -0,0 +1,16 @@
+"""
+Общий ограниченный thread pool для блокирующего I/O и CPU-работы
+(Pillow, ffmpeg, S3) внутри async-эндпоинтов.
+
+Вынесен в отдельный модуль (по образцу limiter.py), чтобы роутеры могли
+шарить один пул вместо безлимитного default-executor'а event loop.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Ограничиваем параллелизм: загрузки масштабируются по ядрам,
+# но не порождают неограниченное число потоков под нагрузкой
+IO_POOL = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 4) * 4),
+    thread_name_prefix="io",
+)
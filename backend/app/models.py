@@ -117,6 +117,7 @@ class Media(Base):
     mime_type = Column(String(100), nullable=True)
     media_type = Column(Enum(MediaType), nullable=False, index=True)
     thumbnail_path = Column(String(500), nullable=True)  # Путь к миниатюре
+    sha256 = Column(String(64), nullable=True, index=True)  # Хэш оригинала (дедупликация загрузок)
     is_animated = Column(Boolean, default=False)  # Флаг для оживленных фото
     animation_task_id = Column(String(255), nullable=True)  # ID задачи анимации
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -128,6 +129,12 @@ class Media(Base):
         back_populates="media",
     )
 
+    # Галерея фильтрует по memorial_id + media_type — композитный индекс
+    # вместо пересечения двух одиночных
+    __table_args__ = (
+        Index('ix_media_memorial_type', 'memorial_id', 'media_type'),
+    )
+
 
 class Memory(Base):
     """Модель воспоминания (текстовый фрагмент для RAG)."""
@@ -149,6 +156,12 @@ class Memory(Base):
     # Связи
     memorial = relationship("Memorial", back_populates="memories")
 
+    # Список воспоминаний мемориала читается с сортировкой по created_at —
+    # композитный индекс покрывает фильтр и избавляет от сортировки
+    __table_args__ = (
+        Index('ix_memories_memorial_created', 'memorial_id', 'created_at'),
+    )
+
 
 class RelationshipType(str, enum.Enum):
     """Типы семейных связей."""
@@ -215,6 +228,9 @@ class FamilyRelationship(Base):
     __table_args__ = (
         UniqueConstraint('memorial_id', 'related_memorial_id', 'relationship_type', name='uq_relationship'),
         Index('ix_family_rel_memorial_type', 'memorial_id', 'relationship_type'),
+        # Обратные lookups (JOIN в get_relationships, поиск reverse-связи) фильтруют
+        # по related_memorial_id — без композитного индекса это скан таблицы
+        Index('ix_family_rel_related_type', 'related_memorial_id', 'relationship_type'),
     )
 
 
@@ -2,30 +2,79 @@
 Pydantic схемы для валидации и сериализации данных.
 """
 from __future__ import annotations
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Dict, Any
+import re
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, StringConstraints
+from typing import Annotated, Any, Literal
+# pydantic v2 принимает TypedDict только из typing_extensions на Python < 3.12
+from typing_extensions import TypedDict
 from datetime import datetime
 from app.models import MediaType, RelationshipType
 
 
+class ORMModel(BaseModel):
+    """База для response-схем, читающих ORM-объекты: один общий
+    model_config вместо отдельного class Config в каждой схеме.
+    frozen: ответы после построения не мутируются (недостающие поля
+    передаются в from_orm_fast через overrides), pydantic-core при этом
+    не тратится на поддержку присваиваний."""
+    model_config = ConfigDict(from_attributes=True, frozen=True, extra="ignore")
+
+    @classmethod
+    def from_orm_fast(cls, obj, **overrides):
+        """
+        model_construct из ORM-объекта без валидации: данные из SQLAlchemy
+        уже нужных типов, повторная коэрция на чтении — чистый оверхед
+        (ощутимый на списках media/memories). overrides — поля, которых нет
+        на ORM-объекте (current_user_role, вложенные списки и т.п.).
+        """
+        data = {}
+        for name in cls.model_fields:
+            if name in overrides:
+                data[name] = overrides[name]
+            elif hasattr(obj, name):
+                data[name] = getattr(obj, name)
+        return cls.model_construct(**data)
+
+
+# Повторяющиеся строковые ограничения — общие Annotated-алиасы: одна
+# и та же метадата переиспользуется всеми схемами при построении core schema
+# (разделять сами Field(...) нельзя — pydantic мутирует FieldInfo при сборке)
+NameStr = Annotated[str, StringConstraints(min_length=1, max_length=255)]
+ContentStr = Annotated[str, StringConstraints(min_length=1)]
+Title255 = Annotated[str, StringConstraints(max_length=255)]
+Label100 = Annotated[str, StringConstraints(max_length=100)]
+Password = Annotated[str, StringConstraints(min_length=8)]
+
+# Лёгкая проверка e-mail вместо EmailStr: email-validator делает IDNA-
+# нормализацию и deliverability-проверки на каждую валидацию и тянет
+# заметный импорт на старте — для MVP достаточно формы x@y.z
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def _check_email(v: str) -> str:
+    if not _EMAIL_RE.match(v):
+        raise ValueError("value is not a valid email address")
+    return v
+
+
+Email = Annotated[str, AfterValidator(_check_email)]
+
+
 # Access Management Schemas
-class AccessEntryResponse(BaseModel):
+class AccessEntryResponse(ORMModel):
     id: int
     memorial_id: int
     user_id: int
     user_email: str
     user_username: str
-    user_full_name: Optional[str] = None
+    user_full_name: str | None = None
     role: str  # "owner" | "editor" | "viewer"
-    granted_by: Optional[int] = None
+    granted_by: int | None = None
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
 class GrantAccessRequest(BaseModel):
-    email: EmailStr
+    email: Email
     role: str = "viewer"  # "editor" | "viewer" (нельзя дать owner через этот endpoint)
 
 
@@ -35,16 +84,16 @@ class UpdateAccessRequest(BaseModel):
 
 # User Schemas
 class UserBase(BaseModel):
-    email: EmailStr
+    email: Email
     username: str
-    full_name: Optional[str] = None
+    full_name: str | None = None
 
 
 class UserCreate(UserBase):
-    password: str = Field(..., min_length=8)
+    password: Password
 
 
-class UserResponse(UserBase):
+class UserResponse(UserBase, ORMModel):
     id: int
     is_active: bool
     is_demo: bool = False
@@ -52,9 +101,6 @@ class UserResponse(UserBase):
     subscription_plan: str = "free"
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
 # Auth Schemas (после UserResponse, т.к. TokenWithUser ссылается на него)
 class Token(BaseModel):
@@ -67,27 +113,27 @@ class TokenWithUser(Token):
 
 
 class LoginRequest(BaseModel):
-    email: EmailStr
+    email: Email
     password: str
 
 
 class PasswordResetRequest(BaseModel):
-    email: EmailStr
+    email: Email
 
 
 class PasswordResetConfirm(BaseModel):
     token: str
-    new_password: str = Field(..., min_length=8)
+    new_password: Password
 
 
 # Memorial Schemas
 class MemorialBase(BaseModel):
-    name: str = Field(..., min_length=1, max_length=255)
-    description: Optional[str] = None
-    birth_date: Optional[datetime] = None
-    death_date: Optional[datetime] = None
+    name: NameStr
+    description: str | None = None
+    birth_date: datetime | None = None
+    death_date: datetime | None = None
     is_public: bool = False
-    voice_gender: Optional[str] = None  # "male" | "female" — пол для выбора голоса озвучки
+    voice_gender: str | None = None  # "male" | "female" — пол для выбора голоса озвучки
     language: str = "ru"  # "ru" | "en"
 
 
@@ -96,31 +142,28 @@ class MemorialCreate(MemorialBase):
 
 
 class MemorialUpdate(BaseModel):
-    name: Optional[str] = Field(None, min_length=1, max_length=255)
-    description: Optional[str] = None
-    birth_date: Optional[datetime] = None
-    death_date: Optional[datetime] = None
-    is_public: Optional[bool] = None
-    voice_id: Optional[str] = None
-    voice_gender: Optional[str] = None
-    cover_photo_id: Optional[int] = None
-    tree_layout_json: Optional[Dict[str, Any]] = None
-
-
-class MemorialResponse(MemorialBase):
+    name: NameStr | None = None
+    description: str | None = None
+    birth_date: datetime | None = None
+    death_date: datetime | None = None
+    is_public: bool | None = None
+    voice_id: str | None = None
+    voice_gender: str | None = None
+    cover_photo_id: int | None = None
+    tree_layout_json: dict[str, Any] | None = None
+
+
+class MemorialResponse(MemorialBase, ORMModel):
     id: int
     owner_id: int
-    voice_id: Optional[str] = None
-    voice_gender: Optional[str] = None
-    cover_photo_id: Optional[int] = None
-    tree_layout_json: Optional[Dict[str, Any]] = None
+    voice_id: str | None = None
+    voice_gender: str | None = None
+    cover_photo_id: int | None = None
+    tree_layout_json: dict[str, Any] | None = None
     created_at: datetime
-    updated_at: Optional[datetime] = None
+    updated_at: datetime | None = None
     is_demo: bool = False
 
-    class Config:
-        from_attributes = True
-
 
 # Media Schemas
 class MediaBase(BaseModel):
@@ -128,31 +171,28 @@ class MediaBase(BaseModel):
     media_type: MediaType
 
 
-class MediaCreate(BaseModel):
-    file_name: str
-    media_type: MediaType
+class MediaCreate(MediaBase):
+    pass
 
 
-class MediaResponse(MediaBase):
+class MediaResponse(MediaBase, ORMModel):
     id: int
     memorial_id: int
     file_path: str
-    file_url: Optional[str] = None
-    file_size: Optional[int] = None
-    mime_type: Optional[str] = None
-    thumbnail_path: Optional[str] = None
+    file_url: str | None = None
+    file_size: int | None = None
+    mime_type: str | None = None
+    thumbnail_path: str | None = None
     is_animated: bool = False
     created_at: datetime
     
-    class Config:
-        from_attributes = True
 
 
 # Memory Schemas
 class MemoryBase(BaseModel):
-    title: Optional[str] = None
-    content: str = Field(..., min_length=1)
-    event_date: Optional[datetime] = None  # Дата события (когда это было)
+    title: str | None = None
+    content: ContentStr
+    event_date: datetime | None = None  # Дата события (когда это было)
 
 
 class MemoryCreate(MemoryBase):
@@ -160,52 +200,48 @@ class MemoryCreate(MemoryBase):
 
 
 class MemoryUpdate(BaseModel):
-    title: Optional[str] = Field(None, max_length=255)
-    content: Optional[str] = Field(None, min_length=1)
-    event_date: Optional[datetime] = None
+    title: Title255 | None = None
+    content: ContentStr | None = None
+    event_date: datetime | None = None
 
 
-class MemoryResponse(MemoryBase):
+class MemoryResponse(MemoryBase, ORMModel):
     id: int
     memorial_id: int
-    embedding_id: Optional[str] = None
-    source: Optional[str] = None
+    embedding_id: str | None = None
+    source: str | None = None
     status: str = 'approved'
-    contributor_name: Optional[str] = None
+    contributor_name: str | None = None
     created_at: datetime
-    updated_at: Optional[datetime] = None
-
-    class Config:
-        from_attributes = True
+    updated_at: datetime | None = None
 
 
 class PublicMemorySubmit(BaseModel):
     """Schema for anonymous visitors submitting a memory for moderation."""
-    title: Optional[str] = Field(None, max_length=255)
+    title: Title255 | None = None
     content: str = Field(..., min_length=10, max_length=5000)
     contributor_name: str = Field(..., min_length=1, max_length=100)
 
 
 class MemorialDetailResponse(MemorialResponse):
     """Мемориал с медиа и воспоминаниями."""
-    media: List[MediaResponse] = []
-    memories: List[MemoryResponse] = []
-    current_user_role: Optional[str] = None  # "owner" | "editor" | "viewer" | null
-
-    class Config:
-        from_attributes = True
+    # tuple вместо list: пустой () — иммутабельный default без фабрики и
+    # без копии списка на каждый инстанс; в JSON это тот же массив
+    media: tuple[MediaResponse, ...] = ()
+    memories: tuple[MemoryResponse, ...] = ()
+    current_user_role: str | None = None  # "owner" | "editor" | "viewer" | null
 
 
 class MemorialListItem(BaseModel):
     """Краткая информация о мемориале для списка."""
     id: int
     name: str
-    description: Optional[str] = None
-    birth_date: Optional[datetime] = None
-    death_date: Optional[datetime] = None
+    description: str | None = None
+    birth_date: datetime | None = None
+    death_date: datetime | None = None
     is_public: bool
-    cover_photo_id: Optional[int] = None
-    cover_photo_url: Optional[str] = None
+    cover_photo_id: int | None = None
+    cover_photo_url: str | None = None
     memories_count: int = 0
     media_count: int = 0
     language: str = "ru"
@@ -214,62 +250,61 @@ class MemorialListItem(BaseModel):
 
 
 class SetCoverRequest(BaseModel):
-    media_id: Optional[int] = None  # None чтобы снять обложку
+    media_id: int | None = None  # None чтобы снять обложку
 
 
-class TimelineItem(BaseModel):
+class TimelineItem(ORMModel):
     id: int
     year: int
     date_label: str
     type: str
-    title: Optional[str] = None
+    title: str | None = None
     content: str
-    event_date: Optional[datetime] = None  # None = воспоминание без даты события (секция «без даты»)
-
-    class Config:
-        from_attributes = True
+    event_date: datetime | None = None  # None = воспоминание без даты события (секция «без даты»)
 
 
 # ElevenLabs (квота для UI)
 class ElevenLabsQuotaResponse(BaseModel):
     configured: bool = True
-    tier: Optional[str] = None
+    tier: str | None = None
     character_count: int = 0
     character_limit: int = 0
     characters_remaining: int = 0
-    next_character_count_reset_unix: Optional[int] = None
+    next_character_count_reset_unix: int | None = None
 
 
 # AI Schemas
 class PhotoAnimateRequest(BaseModel):
     media_id: int
-    prompt: Optional[str] = None  # Опциональный промпт для анимации
+    prompt: str | None = None  # Опциональный промпт для анимации
 
 
 class PhotoAnimateResponse(BaseModel):
     task_id: str
-    status: str
+    # Literal: закрытое множество значений — pydantic-core валидирует
+    # точным сравнением вместо общего str-валидатора + enum в OpenAPI
+    status: Literal["pending", "processing"]
     message: str
-    provider: Optional[str] = None  # "d-id" или "heygen"
+    provider: str | None = None  # "d-id" или "heygen"
 
 
 class AnimationStatusRequest(BaseModel):
     task_id: str  # Может быть Celery task ID или HeyGen video_id
-    media_id: Optional[int] = None  # Если указан, используется для поиска video_id в БД
-    provider: Optional[str] = None  # Если не указан, определяется автоматически
+    media_id: int | None = None  # Если указан, используется для поиска video_id в БД
+    provider: str | None = None  # Если не указан, определяется автоматически
 
 
 class AnimationStatusResponse(BaseModel):
     task_id: str
     status: str  # "processing", "done", "error"
-    video_url: Optional[str] = None
-    error: Optional[str] = None
+    video_url: str | None = None
+    error: str | None = None
     provider: str
 
 
 class AvatarChatRequest(BaseModel):
     memorial_id: int
-    question: str = Field(..., min_length=1)
+    question: ContentStr
     include_audio: bool = False  # Генерировать ли аудио-ответ через ElevenLabs
     use_persona: bool = True  # Использовать Smart Avatar Persona Agent для системного промпта
     include_family_memories: bool = False  # Включить воспоминания родственников в RAG-поиск
@@ -278,11 +313,12 @@ class AvatarChatRequest(BaseModel):
 
 class AvatarChatResponse(BaseModel):
     answer: str
-    audio_url: Optional[str] = None
-    audio_error: Optional[str] = None  # Причина сбоя генерации аудио (если include_audio=True, но аудио нет)
-    animation_task_id: Optional[str] = None
-    animation_provider: Optional[str] = None  # "d-id" или "heygen"
-    sources: List[str] = []  # Список использованных фрагментов воспоминаний
+    audio_url: str | None = None
+    audio_status: str | None = None  # "ready" или "pending" (аудио генерируется в фоне)
+    audio_error: str | None = None  # Причина сбоя генерации аудио (если include_audio=True, но аудио нет)
+    animation_task_id: str | None = None
+    animation_provider: str | None = None  # "d-id" или "heygen"
+    sources: tuple[str, ...] = ()  # Список использованных фрагментов воспоминаний
 
 
 # S3 Schemas
@@ -302,46 +338,44 @@ class PresignedUploadUrlResponse(BaseModel):
 class FamilyRelationshipCreate(BaseModel):
     related_memorial_id: int
     relationship_type: RelationshipType
-    custom_label: Optional[str] = Field(None, max_length=100)  # обязательно для CUSTOM типа
-    notes: Optional[str] = None
-    nickname_for_visitor: Optional[str] = Field(None, max_length=100)
+    custom_label: Label100 | None = None  # обязательно для CUSTOM типа
+    notes: str | None = None
+    nickname_for_visitor: Label100 | None = None
 
 
 class FamilyRelationshipUpdate(BaseModel):
-    relationship_type: Optional[RelationshipType] = None
-    custom_label: Optional[str] = Field(None, max_length=100)
-    notes: Optional[str] = None
-    nickname_for_visitor: Optional[str] = Field(None, max_length=100)
+    relationship_type: RelationshipType | None = None
+    custom_label: Label100 | None = None
+    notes: str | None = None
+    nickname_for_visitor: Label100 | None = None
 
 
-class FamilyRelationshipResponse(BaseModel):
+class FamilyRelationshipResponse(ORMModel):
     id: int
     memorial_id: int
     related_memorial_id: int
     relationship_type: RelationshipType
-    custom_label: Optional[str] = None
-    notes: Optional[str] = None
-    nickname_for_visitor: Optional[str] = None
-    related_memorial_name: Optional[str] = None  # Имя связанного мемориала
+    custom_label: str | None = None
+    notes: str | None = None
+    nickname_for_visitor: str | None = None
+    related_memorial_name: str | None = None  # Имя связанного мемориала
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
-class FamilyTreeNode(BaseModel):
-    """Узел семейного дерева."""
+class FamilyTreeNode(TypedDict, total=False):
+    """
+    Узел семейного дерева. TypedDict, а не BaseModel: узлы строятся в
+    family.py как plain dict (без Pydantic-валидации на каждый узел —
+    см. get_family_tree), тип описывает их форму для mypy и документации.
+    """
     memorial_id: int
     name: str
-    birth_date: Optional[datetime] = None
-    death_date: Optional[datetime] = None
-    relationship_type: Optional[RelationshipType] = None  # Тип связи с родительским узлом
-    cover_photo_id: Optional[int] = None  # ID фото обложки для построения URL на фронтенде
-    children: List["FamilyTreeNode"] = []
-    spouses: List["FamilyTreeNode"] = []
-    
-    class Config:
-        from_attributes = True
+    birth_date: datetime | None
+    death_date: datetime | None
+    relationship_type: str | None  # значение RelationshipType; связь с родительским узлом
+    cover_photo_id: int | None  # ID фото обложки для построения URL на фронтенде
+    children: list["FamilyTreeNode"]
+    spouses: list["FamilyTreeNode"]
 
 
 class FamilyTreeResponse(BaseModel):
@@ -362,24 +396,24 @@ class HiddenConnection(BaseModel):
     """Неочевидная родственная связь через несколько поколений."""
     target_memorial_id: int
     target_name: str
-    path: List[ConnectionStep]   # цепочка от текущего до target
+    path: list[ConnectionStep]   # цепочка от текущего до target
     hops: int                    # длина цепочки (1 = прямая связь, 2+ = скрытая)
     connection_summary: str      # «Троюродный брат через Людмилу Ковалёву и Николая Морозова»
 
 
 class HiddenConnectionsResponse(BaseModel):
-    hidden: List[HiddenConnection]   # hops >= 2
-    direct: List[HiddenConnection]   # hops == 1 (прямые, для справки)
+    hidden: list[HiddenConnection]   # hops >= 2
+    direct: list[HiddenConnection]   # hops == 1 (прямые, для справки)
 
 
 # Full bidirectional graph (ancestors + descendants + cross-family connections)
 class FullTreeNode(BaseModel):
     memorial_id: int
     name: str
-    birth_year: Optional[int] = None
-    death_year: Optional[int] = None
-    cover_photo_id: Optional[int] = None
-    voice_gender: Optional[str] = None  # для UI (рамка «жена» между семьями)
+    birth_year: int | None = None
+    death_year: int | None = None
+    cover_photo_id: int | None = None
+    voice_gender: str | None = None  # для UI (рамка «жена» между семьями)
     generation: int   # 0=root, negative=ancestors, positive=descendants
 
 
@@ -387,12 +421,12 @@ class FullTreeEdge(BaseModel):
     source: int
     target: int
     type: str  # parent, child, spouse, sibling, custom
-    label: Optional[str] = None  # custom_label for custom edges
+    label: str | None = None  # custom_label for custom edges
 
 
 class FullFamilyTreeResponse(BaseModel):
-    nodes: List[FullTreeNode]
-    edges: List[FullTreeEdge]
+    nodes: list[FullTreeNode]
+    edges: list[FullTreeEdge]
     root_id: int
 
 
@@ -400,16 +434,16 @@ class FullFamilyTreeResponse(BaseModel):
 class NetworkClusterMember(BaseModel):
     memorial_id: int
     name: str
-    birth_year: Optional[int] = None
-    death_year: Optional[int] = None
-    cover_photo_id: Optional[int] = None
+    birth_year: int | None = None
+    death_year: int | None = None
+    cover_photo_id: int | None = None
     is_alive: bool = False
 
 
 class NetworkCluster(BaseModel):
     cluster_id: int
     label: str           # e.g. "Kelly · Anderson" (surnames found in cluster)
-    members: List[NetworkClusterMember]
+    members: list[NetworkClusterMember]
     color: str           # hex color for this cluster island
 
 
@@ -424,58 +458,52 @@ class NetworkBridge(BaseModel):
 
 
 class NetworkClustersResponse(BaseModel):
-    clusters: List[NetworkCluster]
-    bridges: List[NetworkBridge]
+    clusters: list[NetworkCluster]
+    bridges: list[NetworkBridge]
     focal_cluster_id: int   # which cluster the requested memorial belongs to
 
 
 # Access Request Schemas
 class AccessRequestCreate(BaseModel):
     requested_role: str = "viewer"  # "editor" | "viewer"
-    message: Optional[str] = None
+    message: str | None = None
 
 
-class AccessRequestResponse(BaseModel):
+class AccessRequestResponse(ORMModel):
     id: int
     memorial_id: int
     user_id: int
     user_email: str
     user_username: str
     requested_role: str
-    message: Optional[str] = None
+    message: str | None = None
     status: str  # "pending" | "approved" | "rejected"
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 
 # Invite Schemas
 class InviteCreate(BaseModel):
-    label: Optional[str] = None
-    expires_days: Optional[int] = None  # None = бессрочный
-    expires_at: Optional[datetime] = None  # явная дата истечения (альтернатива expires_days)
-    permissions: Optional[Dict] = None
+    label: str | None = None
+    expires_days: int | None = None  # None = бессрочный
+    expires_at: datetime | None = None  # явная дата истечения (альтернатива expires_days)
+    permissions: dict | None = None
 
 
-class InviteResponse(BaseModel):
+class InviteResponse(ORMModel):
     token: str
-    label: Optional[str] = None
+    label: str | None = None
     invite_url: str
-    expires_at: Optional[datetime] = None
+    expires_at: datetime | None = None
     uses_count: int
-    permissions: Dict
-
-    class Config:
-        from_attributes = True
+    permissions: dict
 
 
 class InviteValidateResponse(BaseModel):
     memorial_id: int
     memorial_name: str
-    cover_photo_id: Optional[int] = None
-    label: Optional[str] = None
-    permissions: Dict
+    cover_photo_id: int | None = None
+    label: str | None = None
+    permissions: dict
 
 
 # Live Avatar Session Schemas
@@ -488,15 +516,15 @@ class LiveSessionStartResponse(BaseModel):
     session_id: str
     memorial_id: int
     sessions_used: int            # after this request
-    sessions_limit: Optional[int] = None   # None = pool model (lifetime_pro)
-    sessions_remaining: Optional[int] = None  # for pool model
+    sessions_limit: int | None = None   # None = pool model (lifetime_pro)
+    sessions_remaining: int | None = None  # for pool model
     message: str
 
 
 # Waitlist (landing)
 class WaitlistSignupCreate(BaseModel):
-    email: EmailStr
-    source: Optional[str] = Field(None, max_length=64)
+    email: Email
+    source: str | None = Field(None, max_length=64)
 
 
 class WaitlistSignupResponse(BaseModel):
@@ -38,6 +38,11 @@ def generate_thumbnail(
     """
     try:
         with Image.open(image_path) as img:
+            # JPEG fast-path: draft() декодирует сразу уменьшенную картинку
+            # прямо из DCT-коэффициентов (в 2x от целевого размера — запас для
+            # качественного LANCZOS). Для не-JPEG форматов это no-op.
+            img.draft("RGB", (size[0] * 2, size[1] * 2))
+
             # Конвертация в RGB если необходимо (для PNG с прозрачностью)
             if img.mode in ("RGBA", "LA", "P"):
                 # Создаем белый фон
@@ -54,7 +59,7 @@ def generate_thumbnail(
             
             # Сохранение
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            img.save(output_path, "JPEG", quality=quality, optimize=True)
+            img.save(output_path, "JPEG", quality=quality, optimize=True, progressive=True)
             return True
     
     except Exception as e:
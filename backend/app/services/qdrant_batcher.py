@@ -0,0 +1,144 @@
+"""
+Микро-батчинг векторного поиска в Qdrant.
+
+Каждый /avatar/chat делает отдельный search-RPC в Qdrant. Под конкурентной
+нагрузкой запросы, пришедшие в окно ~30 мс, выгоднее объединить в один
+query_batch_points: сеть и парсинг запроса амортизируются на весь батч,
+а одиночный запрос в пустой очереди уходит почти без задержки.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+
+# Максимум запросов в одном батче и окно ожидания добора (секунды)
+MAX_BATCH = 32
+MAX_WAIT = 0.03
+
+# Элемент очереди: (memorial_ids, embedding, top_k, min_score, future)
+_QueueItem = Tuple[List[int], List[float], int, float, "asyncio.Future"]
+
+
+class QdrantSearchBatcher:
+    """
+    Копит конкурентные векторные запросы и выполняет их одним
+    query_batch_points. Каждый вызывающий ждёт свой Future, который
+    резолвится соответствующим элементом батч-ответа.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait: float = MAX_WAIT):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def submit(
+        self,
+        memorial_ids: List[int],
+        embedding: List[float],
+        top_k: int,
+        min_score: float,
+    ) -> List[Dict]:
+        """Поставить запрос в очередь и дождаться результата из батча."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((memorial_ids, embedding, top_k, min_score, future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        # Ленивый старт: очередь и фоновая задача привязываются к текущему
+        # event loop (важно для тестов, где loop пересоздаётся)
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            # Первый элемент ждём сколько угодно, затем добираем батч
+            # не дольше max_wait
+            batch: List[_QueueItem] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._execute(batch)
+
+    async def _execute(self, batch: List[_QueueItem]) -> None:
+        try:
+            from qdrant_client.models import (
+                FieldCondition,
+                Filter,
+                MatchAny,
+                QuantizationSearchParams,
+                QueryRequest,
+                SearchParams,
+            )
+            from app.services.ai_tasks import get_async_vector_db_client
+
+            client = await get_async_vector_db_client()
+            # Коллекция хранит int8-копию векторов (scalar quantization):
+            # основной обход HNSW идёт по int8, а топ кандидатов с запасом
+            # (oversampling) пересчитывается по исходным float32 — recall
+            # остаётся в пределах ~1% от поиска без квантования.
+            search_params = SearchParams(
+                quantization=QuantizationSearchParams(
+                    rescore=True,
+                    oversampling=2.0,
+                )
+            )
+            requests = [
+                QueryRequest(
+                    query=embedding,
+                    filter=Filter(
+                        must=[
+                            FieldCondition(
+                                key="memorial_id",
+                                match=MatchAny(any=memorial_ids),
+                            )
+                        ]
+                    ),
+                    limit=top_k * len(memorial_ids),
+                    score_threshold=min_score,
+                    with_payload=True,
+                    params=search_params,
+                )
+                for memorial_ids, embedding, top_k, min_score, _ in batch
+            ]
+
+            # AsyncQdrantClient не блокирует event loop — thread pool не нужен
+            responses = await client.query_batch_points(
+                collection_name=settings.qdrant_collection,
+                requests=requests,
+            )
+
+            for (_, _, _, _, future), response in zip(batch, responses):
+                if future.done():
+                    continue
+                future.set_result([
+                    {
+                        "id": str(result.id),
+                        "score": result.score,
+                        "text": result.payload.get("text", "") if result.payload else "",
+                        "memory_id": result.payload.get("memory_id") if result.payload else None,
+                        "title": result.payload.get("title", "") if result.payload else "",
+                        "full_text": bool(result.payload.get("full_text")) if result.payload else False,
+                        "source_memorial_id": result.payload.get("memorial_id") if result.payload else None,
+                    }
+                    for result in response.points
+                ])
+        except Exception as e:
+            # Ошибка батча раздаётся всем ожидающим — вызывающий код
+            # (search_similar_memories) сам решает, как деградировать
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+# Глобальный батчер поиска (процесс-локальный)
+search_batcher = QdrantSearchBatcher()
@@ -0,0 +1,125 @@
+"""
+Адаптивное ограничение конкурентности для внешних AI-провайдеров (AIMD).
+
+Без ограничителя всплеск нагрузки (массовая переиндексация, несколько чатов
+одновременно) выливается в шторм запросов к OpenAI/ElevenLabs: провайдер
+отвечает 429, клиенты уходят в повторы и платят латентность за впустую
+потраченные вызовы. Ограничитель держит число одновременных запросов
+к провайдеру в рамках и подстраивает лимит под его фактическую ёмкость:
+Additive Increase / Multiplicative Decrease — успех понемногу поднимает
+лимит, 429/5xx режет его вдвое. Retry-After из ответа провайдера
+выдерживается до конца, прежде чем уйдёт следующий запрос.
+"""
+import asyncio
+import time
+from typing import Optional
+
+
+class AdaptiveLimiter:
+    """
+    AIMD-ограничитель конкурентных запросов к одному провайдеру.
+
+    Используется как async context manager вокруг сетевого вызова:
+
+        async with openai_limiter:
+            response = await client.embeddings.create(...)
+
+    Выход без исключения поднимает лимит на increase_step (до max_limit);
+    исключение с признаком троттлинга (HTTP 429/5xx) делит лимит пополам
+    (не ниже min_limit) и, если провайдер прислал Retry-After, блокирует
+    новые запросы до его истечения.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: float = 4.0,
+        min_limit: float = 1.0,
+        max_limit: float = 16.0,
+        increase_step: float = 0.5,
+    ):
+        self.name = name
+        self._limit = initial
+        self._min = min_limit
+        self._max = max_limit
+        self._step = increase_step
+        self._active = 0
+        self._blocked_until = 0.0  # time.monotonic(), до которого действует Retry-After
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _condition(self) -> asyncio.Condition:
+        # Condition привязан к event loop: worker'ы и seed-скрипты создают
+        # свой через asyncio.run — при смене loop'а пересоздаём примитив
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond = asyncio.Condition()
+            self._loop = loop
+            self._active = 0
+        return self._cond
+
+    async def __aenter__(self) -> "AdaptiveLimiter":
+        cond = self._condition()
+        async with cond:
+            while self._active >= int(self._limit):
+                await cond.wait()
+            self._active += 1
+        # Retry-After выдерживаем уже заняв слот: пока провайдер просит
+        # паузу, сквозь ограничитель не проходит ни один запрос
+        delay = self._blocked_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        cond = self._condition()
+        async with cond:
+            self._active -= 1
+            if exc is None:
+                self._limit = min(self._max, self._limit + self._step)
+            elif self._is_throttle(exc):
+                self._limit = max(self._min, self._limit / 2)
+                self._apply_retry_after(exc)
+                print(
+                    f"Rate limiter [{self.name}]: throttled by provider, "
+                    f"concurrency -> {int(self._limit)}"
+                )
+            cond.notify_all()
+        return False  # исключения не глотаем
+
+    @staticmethod
+    def _status_code(exc: BaseException) -> Optional[int]:
+        """HTTP-статус из исключения openai.* или httpx.*, если он там есть."""
+        code = getattr(exc, "status_code", None)
+        if isinstance(code, int):
+            return code
+        response = getattr(exc, "response", None)
+        code = getattr(response, "status_code", None)
+        return code if isinstance(code, int) else None
+
+    def _is_throttle(self, exc: BaseException) -> bool:
+        code = self._status_code(exc)
+        if code is not None:
+            return code == 429 or code >= 500
+        # ai_tasks оборачивает ошибки провайдеров в ValueError с текстом ответа
+        message = str(exc).lower()
+        return "429" in message or "rate limit" in message
+
+    def _apply_retry_after(self, exc: BaseException) -> None:
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return
+        try:
+            seconds = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return
+        # Ограничиваем минутой: Retry-After в часах — признак бана, а не троттлинга
+        self._blocked_until = max(
+            self._blocked_until, time.monotonic() + min(seconds, 60.0)
+        )
+
+
+# Процесс-локальные ограничители по провайдерам
+openai_limiter = AdaptiveLimiter("openai")
+elevenlabs_limiter = AdaptiveLimiter("elevenlabs", initial=2.0, max_limit=8.0)
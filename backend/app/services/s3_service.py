@@ -1,17 +1,38 @@
 """
 Сервис для работы с AWS S3 (загрузка, получение, presigned URLs).
 """
+from functools import lru_cache
 from typing import Optional
 from pathlib import Path
+import time
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from app.config import settings
 from datetime import timedelta
 
 
+@lru_cache(maxsize=1)
+def _build_s3_client():
+    """Однократное создание клиента (SigV4-деривация ключей, пул соединений)."""
+    kwargs = {
+        "region_name": settings.S3_REGION,
+        "aws_access_key_id": settings.AWS_ACCESS_KEY_ID,
+        "aws_secret_access_key": settings.AWS_SECRET_ACCESS_KEY,
+        # Пул соединений под размер IO_POOL: параллельные загрузки
+        # переиспользуют TCP/TLS-сессии вместо рукопожатия на каждый вызов
+        "config": Config(max_pool_connections=64, signature_version="s3v4"),
+    }
+    if settings.s3_endpoint_url:
+        kwargs["endpoint_url"] = settings.s3_endpoint_url
+
+    return boto3.client("s3", **kwargs)
+
+
 def get_s3_client():
     """
-    Создает и возвращает S3 клиент.
+    Возвращает общий S3 клиент (создаётся один раз на процесс).
+    Клиенты boto3 потокобезопасны — безопасно и из IO_POOL.
     Поддерживает Supabase Storage (через endpoint_url) и AWS S3.
     """
     if not settings.USE_S3:
@@ -20,15 +41,7 @@ def get_s3_client():
     if not all([settings.AWS_ACCESS_KEY_ID, settings.AWS_SECRET_ACCESS_KEY, settings.S3_BUCKET_NAME]):
         return None
 
-    kwargs = {
-        "region_name": settings.S3_REGION,
-        "aws_access_key_id": settings.AWS_ACCESS_KEY_ID,
-        "aws_secret_access_key": settings.AWS_SECRET_ACCESS_KEY,
-    }
-    if settings.s3_endpoint_url:
-        kwargs["endpoint_url"] = settings.s3_endpoint_url
-
-    return boto3.client("s3", **kwargs)
+    return _build_s3_client()
 
 
 def get_public_url(s3_key: str) -> str:
@@ -41,6 +54,34 @@ def get_public_url(s3_key: str) -> str:
     return ""
 
 
+def get_object_public_url(s3_key: str) -> str:
+    """
+    Стабильный (не подписанный) URL объекта: Supabase public URL либо
+    прямой URL бакета AWS. В отличие от presigned URL не истекает,
+    поэтому его можно хранить в БД (file_url).
+    """
+    if settings.supabase_public_url:
+        return f"{settings.supabase_public_url}/{s3_key}"
+    if settings.s3_endpoint_url:
+        return f"{settings.s3_endpoint_url.rstrip('/')}/{settings.S3_BUCKET_NAME}/{s3_key}"
+    return f"https://{settings.S3_BUCKET_NAME}.s3.{settings.S3_REGION}.amazonaws.com/{s3_key}"
+
+
+@lru_cache(maxsize=4096)
+def _presigned_download_cached(s3_key: str, hour_bucket: int, expires_in: int) -> Optional[str]:
+    """SigV4-подпись по (ключ, час): повторные чтения в течение часа делят одну подпись."""
+    return get_presigned_download_url(s3_key, expires_in=expires_in)
+
+
+def get_presigned_download_url_cached(s3_key: str, expires_in: int = 7200) -> Optional[str]:
+    """
+    Presigned URL для скачивания с кэшем на час.
+    expires_in должен быть заметно больше часа, чтобы URL, выданный
+    в конце часового окна, не истёк у клиента сразу.
+    """
+    return _presigned_download_cached(s3_key, int(time.time() // 3600), expires_in)
+
+
 def upload_file_to_s3(
     local_file_path: Path,
     s3_key: str,
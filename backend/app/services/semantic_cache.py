@@ -0,0 +1,109 @@
+"""
+Семантический кэш ответов аватара.
+
+Близкие по смыслу перефразировки одного вопроса ("Где он учился?" /
+"Расскажи, где он учился") дают почти одинаковые embeddings, поэтому готовый
+ответ можно отдать из кэша без повторного похода в OpenAI и ElevenLabs:
+вопрос сравнивается с сохранёнными векторами по косинусной близости.
+
+Реализация in-process, без внешних зависимостей: векторы L2-нормализуются
+при записи, так что косинус сводится к скалярному произведению. Для каждого
+namespace (мемориал + параметры запроса) — своё пространство ключей,
+записи ограничены TTL и LRU-вытеснением.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Порог косинусной близости, при котором вопросы считаются одинаковыми.
+# 0.92 подобран консервативно: перефразировки проходят, другие вопросы — нет.
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    """L2-нормализация вектора (после неё косинус = dot product)."""
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return list(vector)
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """
+    LRU-кэш значений, адресуемых embedding-вектором с нечётким совпадением.
+
+    get() возвращает значение, чей сохранённый вектор ближе всего к запросу
+    и превышает порог косинусной близости; put() добавляет новую запись.
+    Потокобезопасен (uvicorn workers + Celery fallback в одном процессе).
+    """
+
+    def __init__(self, max_size: int = 500, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # namespace -> OrderedDict[entry_id -> (normalized_vector, value, expires_at)]
+        self._namespaces: Dict[Hashable, "OrderedDict[int, Tuple[List[float], Any, float]]"] = {}
+        self._next_id = 0
+
+    def get(
+        self,
+        namespace: Hashable,
+        embedding: List[float],
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ) -> Optional[Any]:
+        """Вернуть закэшированное значение для ближайшего вопроса или None."""
+        query = _normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if not entries:
+                return None
+
+            # Чистим просроченные записи заодно с поиском
+            expired = [key for key, (_, _, exp) in entries.items() if exp <= now]
+            for key in expired:
+                del entries[key]
+
+            best_key = None
+            best_score = threshold
+            for key, (vector, _, _) in entries.items():
+                score = sum(a * b for a, b in zip(query, vector))
+                if score >= best_score:
+                    best_score = score
+                    best_key = key
+
+            if best_key is None:
+                return None
+
+            entries.move_to_end(best_key)  # LRU: недавно использованное — в конец
+            return entries[best_key][1]
+
+    def put(
+        self,
+        namespace: Hashable,
+        embedding: List[float],
+        value: Any,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Сохранить значение под embedding-вектором вопроса."""
+        vector = _normalize(embedding)
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            entries = self._namespaces.setdefault(namespace, OrderedDict())
+            self._next_id += 1
+            entries[self._next_id] = (vector, value, expires_at)
+            # LRU-вытеснение считаем по namespace — один "горячий" мемориал
+            # не должен вытеснять кэш остальных
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+
+    def invalidate(self, namespace: Hashable) -> None:
+        """Сбросить кэш namespace (например, после добавления воспоминания)."""
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+
+
+# Глобальный кэш ответов /avatar/chat (процесс-локальный)
+chat_answer_cache = SemanticCache(max_size=500, ttl=3600.0)
@@ -0,0 +1,76 @@
+"""
+Простой in-process TTL-кэш для горячих read-путей.
+
+AI-эндпоинты (чат, поллинг статуса анимации) читают одни и те же строки
+Memorial/Media десятками запросов подряд — короткий TTL позволяет пропустить
+повторный SQL round-trip, не рискуя надолго отдать устаревшие данные.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """LRU-кэш с ограничением размера и временем жизни записей (monotonic)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 10.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (value, expires_at)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """Инвалидация записи (после записи в БД)."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+def ttl_cache(maxsize: int = 1024, ttl: float = 10.0):
+    """
+    Декоратор мемоизации по позиционным аргументам с TTL.
+
+    None-результаты не кэшируются (отсутствующая строка может появиться).
+    Кэш доступен как attr `.cache` для инвалидации.
+    """
+    def decorator(func):
+        cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        @wraps(func)
+        def wrapper(*args):
+            hit = cache.get(args)
+            if hit is not None:
+                return hit
+            value = func(*args)
+            if value is not None:
+                cache.set(args, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
@@ -18,6 +18,27 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    # «Честное» планирование: без prefetch короткие embedding-задачи не встают
+    # в очередь за многоминутным polling'ом animate_photo_task у того же воркера.
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    broker_transport_options={"visibility_timeout": 3600},
+    # Раздельные очереди: воркер анимаций можно запускать отдельно от embedding'ов
+    # (celery -A app.workers.worker worker -Q animate / -Q embed,celery).
+    # Без -Q воркер слушает все три очереди — команда из README работает как раньше.
+    task_default_queue="celery",
+    task_queues={
+        "celery": {},
+        "animate": {},
+        "embed": {},
+    },
+    task_routes={
+        "animate_photo": {"queue": "animate"},
+        "create_memory_embedding": {"queue": "embed"},
+        "batch_create_memory_embeddings": {"queue": "embed"},
+        "generate_tts": {"queue": "embed"},
+    },
 )
 
 
@@ -199,6 +220,126 @@ def create_memory_embedding_task(self, memory_id: int, memorial_id: int, text: s
     return asyncio.run(process())
 
 
+@celery_app.task(name="batch_create_memory_embeddings", bind=True, max_retries=3)
+def batch_create_memory_embeddings_task(self, memorial_id: int, items: list):
+    """
+    Фоновая задача для создания embeddings сразу для пачки воспоминаний.
+
+    Один батч-запрос к OpenAI (input: List[str]) вместо отдельного вызова
+    на каждое воспоминание. Элемент батча — уникальный текст и СПИСОК
+    memory_id с этим текстом: дубли контента получают один общий embedding
+    (один вызов OpenAI), вектор апсертится для каждого memory_id отдельно.
+
+    Args:
+        memorial_id: ID мемориала
+        items: Список пар [memory_ids, text], где memory_ids — список ID
+               воспоминаний с одинаковым content
+    """
+    import asyncio
+    from app.services.ai_tasks import bulk_upsert_memory_embeddings, get_embeddings_batch
+    from app.db import SessionLocal
+    from app.models import Memory
+
+    async def process():
+        db = SessionLocal()
+        try:
+            all_memory_ids = [mid for item in items for mid in item[0]]
+            memories = {
+                m.id: m
+                for m in db.query(Memory).filter(Memory.id.in_(all_memory_ids)).all()
+            }
+
+            # Один HTTP round-trip к OpenAI на весь батч уникальных текстов
+            try:
+                embeddings = await get_embeddings_batch([item[1] for item in items])
+            except Exception as e:
+                return {"status": "error", "message": f"Failed to create embeddings: {str(e)}"}
+
+            # Собираем все точки и апсертим одним запросом к векторной БД
+            # (вместо HTTP round-trip'а на каждое воспоминание)
+            upsert_items = []
+            failed = 0
+            for (memory_ids, text), embedding in zip(items, embeddings):
+                for memory_id in memory_ids:
+                    memory = memories.get(memory_id)
+                    if not memory:
+                        failed += 1
+                        continue
+                    upsert_items.append({
+                        "memory_id": memory_id,
+                        "memorial_id": memorial_id,
+                        "text": text,
+                        "embedding": embedding,
+                        "title": memory.title,
+                    })
+
+            ok = 0
+            try:
+                vector_ids = await bulk_upsert_memory_embeddings(upsert_items)
+                for item, vector_id in zip(upsert_items, vector_ids):
+                    memories[item["memory_id"]].embedding_id = vector_id
+                    ok += 1
+            except Exception as e:
+                print(f"Failed to bulk upsert embeddings: {e}")
+                failed += len(upsert_items)
+
+            db.commit()
+            return {"status": "completed", "ok": ok, "failed": failed}
+
+        except Exception as e:
+            # Повтор при ошибке
+            raise self.retry(exc=e, countdown=60)
+
+        finally:
+            db.close()
+
+    return asyncio.run(process())
+
+
+@celery_app.task(name="generate_tts", bind=True, max_retries=2)
+def generate_tts_task(self, answer: str, voice_id: str, memorial_id: int, audio_key: str):
+    """
+    Фоновая задача генерации озвучки ответа чата через ElevenLabs.
+
+    Позволяет отдать текстовый ответ сразу, не дожидаясь TTS (2-5 сек):
+    эндпоинт возвращает предсказуемый audio_url (имя файла строится из
+    audio_key), а воркер пишет mp3 по этому пути.
+
+    Args:
+        answer: Текст ответа для озвучки
+        voice_id: ID голоса ElevenLabs
+        memorial_id: ID мемориала (входит в имя файла)
+        audio_key: Content-хэш ответа (sha1 от voice_id|answer)
+    """
+    import asyncio
+    from pathlib import Path
+    from app.config import settings
+    from app.services.ai_tasks import generate_speech_elevenlabs
+    from app.services.s3_service import upload_file_to_s3
+
+    async def process():
+        audio_dir = Path("uploads/audio")
+        audio_dir.mkdir(exist_ok=True)
+        audio_filename = f"chat_{memorial_id}_{audio_key}.mp3"
+        audio_path = audio_dir / audio_filename
+
+        # Тот же ответ тем же голосом уже озвучен — ничего не делаем
+        if not audio_path.exists():
+            audio_bytes = await generate_speech_elevenlabs(answer, voice_id=voice_id)
+            with open(audio_path, "wb") as f:
+                f.write(audio_bytes)
+
+        if settings.USE_S3 and settings.supabase_public_url:
+            upload_file_to_s3(audio_path, f"audio/{audio_filename}", "audio/mpeg")
+
+        return {"status": "completed", "audio_filename": audio_filename}
+
+    try:
+        return asyncio.run(process())
+    except Exception as e:
+        raise self.retry(exc=e, countdown=10)
+
+
 # Для запуска worker'а:
 # celery -A app.workers.worker worker --loglevel=info
 
@@ -37,11 +37,13 @@ def test_avatar_chat_with_memories(client, memorial, db_session):
 
     with (
         patch("app.api.ai.get_embedding", new_callable=AsyncMock) as mock_embed,
+        patch("app.services.ai_tasks.get_embeddings_batch", new_callable=AsyncMock) as mock_batch,
         patch("app.services.ai_tasks.upsert_memory_embedding", new_callable=AsyncMock) as mock_upsert,
         patch("app.api.ai.search_similar_memories", new_callable=AsyncMock) as mock_search,
         patch("app.api.ai.generate_rag_response", new_callable=AsyncMock) as mock_generate,
     ):
         mock_embed.return_value = [0.0] * 1536
+        mock_batch.side_effect = lambda texts: [[0.0] * 1536 for _ in texts]
         mock_upsert.return_value = "test-vector-id"
         mock_search.return_value = [
             {
@@ -142,11 +144,13 @@ def test_avatar_chat_family_rag(auth_client, memorial, db_session):
 
     with (
         patch("app.api.ai.get_embedding", new_callable=AsyncMock) as mock_embed,
+        patch("app.services.ai_tasks.get_embeddings_batch", new_callable=AsyncMock) as mock_batch,
         patch("app.services.ai_tasks.upsert_memory_embedding", new_callable=AsyncMock) as mock_upsert,
         patch("app.api.ai.search_similar_memories", new_callable=AsyncMock) as mock_search,
         patch("app.api.ai.generate_rag_response", new_callable=AsyncMock) as mock_gen,
     ):
         mock_embed.return_value = [0.0] * 1536
+        mock_batch.side_effect = lambda texts: [[0.0] * 1536 for _ in texts]
         mock_upsert.return_value = "test-vector-id"
         mock_search.return_value = [
             {
@@ -174,6 +178,78 @@ def test_avatar_chat_family_rag(auth_client, memorial, db_session):
     assert len(data["sources"]) > 0
 
 
+def test_avatar_chat_audio_pending_background_tts(client, memorial, monkeypatch):
+    """Упал только TTS при достримившемся ответе → озвучка уходит в Celery:
+    ответ возвращается сразу с audio_status=pending, клиент поллит статус-эндпоинт."""
+    from app.config import settings as app_settings
+
+    mid = memorial["id"]
+    monkeypatch.setattr(app_settings, "ELEVENLABS_API_KEY", "test-key")
+    monkeypatch.setattr(app_settings, "ELEVENLABS_VOICE_ID", "test-voice")
+
+    # Воспоминание нужно, чтобы чат не ушёл в ранний ответ "нет воспоминаний"
+    mem_resp = client.post(
+        f"/api/v1/memorials/{mid}/memories",
+        json={"title": "Хобби", "content": "Он любил рыбалку на Волге."},
+    )
+    assert mem_resp.status_code == 201
+    memory_id = mem_resp.json()["id"]
+
+    async def fake_stream(**kwargs):
+        yield "Он любил рыбалку."
+        yield "Каждое лето ездил на Волгу."
+
+    fake_tts_task = MagicMock()
+
+    with (
+        patch("app.api.ai.get_embedding", new_callable=AsyncMock) as mock_embed,
+        patch("app.services.ai_tasks.get_embeddings_batch", new_callable=AsyncMock) as mock_batch,
+        patch("app.services.ai_tasks.upsert_memory_embedding", new_callable=AsyncMock) as mock_upsert,
+        patch("app.api.ai.search_similar_memories", new_callable=AsyncMock) as mock_search,
+        patch("app.api.ai.generate_rag_response_stream", fake_stream),
+        patch(
+            "app.api.ai.generate_speech_elevenlabs",
+            new=AsyncMock(side_effect=ValueError("ElevenLabs API error 500")),
+        ),
+        patch("app.api.ai.generate_tts_task", fake_tts_task),
+    ):
+        mock_embed.return_value = [0.0] * 1536
+        mock_batch.side_effect = lambda texts: [[0.0] * 1536 for _ in texts]
+        mock_upsert.return_value = "test-vector-id"
+        mock_search.return_value = [
+            {
+                "memory_id": memory_id,
+                "score": 0.9,
+                "text": "Он любил рыбалку на Волге.",
+                "title": "Хобби",
+            }
+        ]
+
+        response = client.post(
+            "/api/v1/ai/avatar/chat",
+            json={
+                "memorial_id": mid,
+                "question": "Чем он увлекался?",
+                "include_audio": True,
+                "use_persona": False,
+            },
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["answer"] == "Он любил рыбалку. Каждое лето ездил на Волгу."
+    assert data["audio_status"] == "pending"
+    assert data["audio_error"] is None
+    assert data["audio_url"].endswith(".mp3")
+    fake_tts_task.delay.assert_called_once()
+
+    # Пока воркер не записал mp3, статус-эндпоинт отвечает pending
+    filename = data["audio_url"].rsplit("/", 1)[-1]
+    status_resp = client.get(f"/api/v1/ai/chat/audio/{filename}/status")
+    assert status_resp.status_code == 200
+    assert status_resp.json()["status"] == "pending"
+
+
 def test_animation_status(client):
     """Статус анимации возвращается корректно при замоке get_animation_status."""
     with patch(
@@ -516,3 +516,68 @@ class TestFullTree:
         nodes = {n["memorial_id"]: n["generation"] for n in resp.json()["nodes"]}
         assert nodes[sarah["id"]] == nodes[michael["id"]] + 1
         assert nodes[marco["id"]] == nodes[michael["id"]]
+
+
+# ══════════════════════════════════════════════════════════════════════════
+# 8. BATCH-СОЗДАНИЕ СВЯЗЕЙ
+# ══════════════════════════════════════════════════════════════════════════
+
+class TestBatchCreate:
+
+    def test_batch_creates_forward_and_reverse(self, auth_client):
+        """Batch создаёт все прямые связи и автообратные одним запросом."""
+        root = mk_memorial(auth_client, "Batch-Root")
+        father = mk_memorial(auth_client, "Batch-Father")
+        wife = mk_memorial(auth_client, "Batch-Wife")
+        resp = auth_client.post(
+            f"/api/v1/family/memorials/{root['id']}/relationships/batch",
+            json=[
+                {"related_memorial_id": father["id"], "relationship_type": "parent"},
+                {"related_memorial_id": wife["id"], "relationship_type": "spouse"},
+            ],
+        )
+        assert resp.status_code == 201
+        created = resp.json()
+        assert len(created) == 2
+        assert has_rel(created, father["id"], "parent")
+        assert has_rel(created, wife["id"], "spouse")
+        # Автообратные
+        assert has_rel(get_rels(auth_client, father["id"]), root["id"], "child")
+        assert has_rel(get_rels(auth_client, wife["id"]), root["id"], "spouse")
+
+    def test_batch_skips_existing_duplicates(self, auth_client):
+        """Существующая связь молча пропускается, остальные создаются."""
+        root = mk_memorial(auth_client, "Batch-Dup-Root")
+        father = mk_memorial(auth_client, "Batch-Dup-Father")
+        sibling = mk_memorial(auth_client, "Batch-Dup-Sibling")
+        assert add_rel(auth_client, root["id"], father["id"], "parent").status_code == 201
+        resp = auth_client.post(
+            f"/api/v1/family/memorials/{root['id']}/relationships/batch",
+            json=[
+                {"related_memorial_id": father["id"], "relationship_type": "parent"},
+                {"related_memorial_id": sibling["id"], "relationship_type": "sibling"},
+            ],
+        )
+        assert resp.status_code == 201
+        created = resp.json()
+        assert len(created) == 1
+        assert has_rel(created, sibling["id"], "sibling")
+
+    def test_batch_self_relation_forbidden(self, auth_client):
+        """Самосвязь в батче отклоняется целиком."""
+        root = mk_memorial(auth_client, "Batch-Self")
+        resp = auth_client.post(
+            f"/api/v1/family/memorials/{root['id']}/relationships/batch",
+            json=[{"related_memorial_id": root["id"], "relationship_type": "parent"}],
+        )
+        assert resp.status_code == 400
+
+    def test_batch_unknown_memorial_404(self, auth_client):
+        """Неизвестный related_memorial_id в батче — 404, ничего не создано."""
+        root = mk_memorial(auth_client, "Batch-404")
+        resp = auth_client.post(
+            f"/api/v1/family/memorials/{root['id']}/relationships/batch",
+            json=[{"related_memorial_id": 999999, "relationship_type": "parent"}],
+        )
+        assert resp.status_code == 404
+        assert get_rels(auth_client, root["id"]) == []
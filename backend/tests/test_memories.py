@@ -115,3 +115,30 @@ def test_delete_memory(client, memorial):
     list_resp = client.get(f"/api/v1/memorials/{mid}/memories")
     ids = [m["id"] for m in list_resp.json()]
     assert memory_id not in ids
+
+
+def test_create_memories_batch(client, memorial):
+    mid = memorial["id"]
+    response = client.post(
+        f"/api/v1/memorials/{mid}/memories/batch",
+        json=[
+            {"title": "Школа", "content": "Учился в школе №5."},
+            {"title": "Работа", "content": "Работал инженером на заводе."},
+        ],
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert len(data) == 2
+    assert {m["title"] for m in data} == {"Школа", "Работа"}
+    assert all(m["memorial_id"] == mid for m in data)
+    # Все воспоминания сохранены в БД
+    listed = client.get(f"/api/v1/memorials/{mid}/memories").json()
+    titles = {m["title"] for m in listed}
+    assert {"Школа", "Работа"} <= titles
+
+
+def test_create_memories_batch_empty(client, memorial):
+    mid = memorial["id"]
+    response = client.post(f"/api/v1/memorials/{mid}/memories/batch", json=[])
+    assert response.status_code == 201
+    assert response.json() == []
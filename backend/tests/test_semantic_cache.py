@@ -0,0 +1,46 @@
+"""
+Тесты семантического кэша ответов аватара.
+"""
+from app.services.semantic_cache import SemanticCache
+
+
+def test_hit_on_similar_vector():
+    """Близкий по косинусу вектор возвращает закэшированное значение."""
+    cache = SemanticCache(max_size=10, ttl=60)
+    cache.put("ns", [1.0, 0.0, 0.0], {"answer": "ответ"})
+
+    # Почти тот же вектор (косинус ~0.999)
+    hit = cache.get("ns", [0.99, 0.02, 0.0])
+    assert hit == {"answer": "ответ"}
+
+
+def test_miss_below_threshold_and_namespace_isolation():
+    """Ортогональный вектор и чужой namespace не дают попадания."""
+    cache = SemanticCache(max_size=10, ttl=60)
+    cache.put("ns", [1.0, 0.0, 0.0], "value")
+
+    assert cache.get("ns", [0.0, 1.0, 0.0]) is None
+    assert cache.get("other-ns", [1.0, 0.0, 0.0]) is None
+
+
+def test_ttl_expiry_and_invalidate():
+    """Просроченная запись не возвращается; invalidate сбрасывает namespace."""
+    cache = SemanticCache(max_size=10, ttl=0)
+    cache.put("ns", [1.0, 0.0], "expired")
+    assert cache.get("ns", [1.0, 0.0]) is None
+
+    cache.put("ns", [1.0, 0.0], "fresh", ttl=60)
+    cache.invalidate("ns")
+    assert cache.get("ns", [1.0, 0.0]) is None
+
+
+def test_lru_eviction():
+    """При переполнении вытесняется самая старая запись."""
+    cache = SemanticCache(max_size=2, ttl=60)
+    cache.put("ns", [1.0, 0.0, 0.0], "a")
+    cache.put("ns", [0.0, 1.0, 0.0], "b")
+    cache.put("ns", [0.0, 0.0, 1.0], "c")
+
+    assert cache.get("ns", [1.0, 0.0, 0.0]) is None
+    assert cache.get("ns", [0.0, 1.0, 0.0]) == "b"
+    assert cache.get("ns", [0.0, 0.0, 1.0]) == "c"
@@ -116,6 +116,8 @@ export const aiAPI = {
   animatePhoto: (data) => apiClient.post('/ai/photo/animate', data),
   getAnimationStatus: (data) => apiClient.post('/ai/animation/status', data),
   chat: (data) => apiClient.post('/ai/avatar/chat', data),
+  getChatAudioStatus: (audioFilename) =>
+    apiClient.get(`/ai/chat/audio/${audioFilename}/status`),
   syncFamilyMemories: (memorialId, dryRun = false) =>
     apiClient.post(`/ai/family/sync-memories/${memorialId}?dry_run=${dryRun}`),
   transcribe: (audioFile, language = 'ru') => {
@@ -174,6 +174,36 @@ function AvatarChat({ memorialId, coverPhotoId, memorialName, onMessageSent }) {
     return () => clearInterval(interval)
   }, [messages])
 
+  // Polling фоновой озвучки: пока статус pending, mp3 ещё не записан воркером —
+  // URL подключаем к плееру только после status=ready
+  useEffect(() => {
+    const pendingAudio = messages.filter(
+      (m) => m.role === 'assistant' && m.audioFilename && m.audioStatus === 'pending'
+    )
+    if (pendingAudio.length === 0) return
+
+    const interval = setInterval(async () => {
+      for (const msg of pendingAudio) {
+        try {
+          const res = await aiAPI.getChatAudioStatus(msg.audioFilename)
+          if (res.data.status === 'ready') {
+            setMessages((prev) =>
+              prev.map((m) =>
+                m.audioFilename === msg.audioFilename
+                  ? { ...m, audioUrl: m.pendingAudioUrl, audioStatus: 'ready' }
+                  : m
+              )
+            )
+          }
+        } catch (err) {
+          console.warn('Audio status poll error:', err)
+        }
+      }
+    }, 3000)
+
+    return () => clearInterval(interval)
+  }, [messages])
+
   useEffect(() => {
     const checkVoice = async () => {
       try {
@@ -254,10 +284,18 @@ function AvatarChat({ memorialId, coverPhotoId, memorialName, onMessageSent }) {
         }
       }
 
+      // При audio_status=pending mp3 ещё пишется воркером: URL плееру не отдаём
+      // (будет 404), а поллим /chat/audio/{filename}/status и подставляем по готовности
+      const audioStatus = response.data.audio_status || null
+      const audioPending = audioStatus === 'pending' && !!audioUrl
+
       const assistantMessage = {
         role: 'assistant',
         text: response.data.answer,
-        audioUrl,
+        audioUrl: audioPending ? null : audioUrl,
+        pendingAudioUrl: audioPending ? audioUrl : null,
+        audioFilename: audioPending ? audioUrl.split('/').pop() : null,
+        audioStatus,
         audioError: response.data.audio_error || null,
         animationTaskId: response.data.animation_task_id || null,
         animationProvider: response.data.animation_provider || null,